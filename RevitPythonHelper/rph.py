@@ -4,7 +4,8 @@
 
 
     This is not a clone of RevitLookup, the first goal is to provide doc, not datas,
-    some values are still displayed for simple builtins types (todo : read nested arrays, maps...)
+    some values are still displayed for simple builtins types, collections are summarised
+    with their count and first items (double-click to list the items)
 
     Usage
     In the console REPL, call the form with an object to flesh out its members and try to extract any available doc  :
@@ -14,8 +15,48 @@
 
     >>>h(rph)
 
+    The members of each type are cached, check the cache efficiency with :
+
+    >>>rph.member_cache.stats()
+
+    The cache of the CLR types is saved in DISK_CACHE_DIR when a form is closed
+    (or with rph.save_cache()), one file per assembly version.
+
+    Snapshot : write an element and the objects reachable from it to a json lines file,
+    and explore it later without Revit :
+
+    >>>rph.crawl(wall, 'C:\\temp\\wall.jsonl', depth=2)
+    >>>h(rph.load_snapshot('C:\\temp\\wall.jsonl'))
+
+    Diff : compare the members and parameters of two objects, only the differences are shown
+
+    >>>rph.diff(wall_a, wall_b)
+
+    Global search : find a type or a member in all the loaded assemblies with the Find
+    button (text of the search box) or from the REPL :
+
+    >>>rph.find('CompoundStructure')
+
+    Offline doc : copy RevitAPI.xml and RevitAPIUI.xml (Revit SDK) next to the assemblies
+    (or set API_DOC_DIR), their summaries are shown in the top panel and the Infos column.
+
+    Watch : check Watch (or call h(wall, watch=True)) to keep the values of an element
+    up to date, only the cells changed by a transaction are read again and repainted.
+
+    Prefetch : the types of the hovered or selected properties are warmed in the member
+    cache on a worker thread (PREFETCH_DEPTH, PREFETCH_BUDGET_MS), check it with :
+
+    >>>rph.prefetcher.stats()
+
+    Call h(obj, lazy=True) to read the property values only when their rows are displayed.
+
+    Find the slow getters of a type with h(obj, timing=True) (column ms) or from the REPL :
+
+    >>>rph.profile(wall, 'C:\\temp\\wall.csv')
+
     Tips: 
-    - Double-click on a member to open a new tab.
+    - Double-click on a member to open it in the same form (< and > to go back and forward),
+      Ctrl + double-click to open a new form.
     - Add "from rph import h" in the RevitPythonShell __init__.py file to call the form more easily.
 
     Contact:
@@ -23,20 +64,116 @@
 '''
 import os
 import re
+import csv
 import clr
+import json
+import time
+import threading
+import weakref
 import webbrowser
+from types import ModuleType
+from bisect import bisect_left
+from heapq import merge
+from itertools import islice
+from collections import OrderedDict, deque
 
 clr.AddReference('System.Windows.Forms')
 clr.AddReference('System.Drawing')
 
 import System.Object
-import System.String
+from System import Action, AppDomain
+from System.Reflection import BindingFlags, MemberTypes
+from System.Xml import XmlReader, XmlNodeType
+from System.Collections import IEnumerable, IDictionary
 from System.Drawing import (FontStyle, Point, Color, Size, Font, Image)
-from System.Windows.Forms import (Form, ToolTip, Padding, SplitContainer, CheckBox,
+from System.Windows.Forms import (Form, ToolTip, Padding, SplitContainer, CheckBox, TextBox,
+    Control, Keys, ComboBox, ComboBoxStyle,
     FixedPanel, FormStartPosition, DataGridViewAutoSizeRowsMode, FlowLayoutPanel,
     RichTextBox, Button, DockStyle, DataGridView, DataGridViewTextBoxColumn,
     DataGridViewAutoSizeColumnMode, AutoSizeMode, Orientation, DataGridViewContentAlignment,
-    DataGridViewSelectionMode, DataGridViewAutoSizeRowsMode, DataGridViewTriState)
+    DataGridViewSelectionMode, DataGridViewAutoSizeRowsMode, DataGridViewTriState,
+    DataGridViewColumnSortMode, SortOrder)
+
+
+# number of types kept in the member cache
+MEMBER_CACHE_SIZE = 64
+
+# folder of the member cache saved between sessions, None to disable it
+DISK_CACHE_DIR = os.path.join(os.path.expandvars('%APPDATA%'), 'RevitPythonHelper', 'cache')
+
+# version of the data saved in the cache files, bump it when their content changes
+DISK_CACHE_FORMAT = 3
+
+# offline doc : assemblies with a xml doc file (RevitAPI.xml...), and the folder of
+# these files, None to look next to the assemblies
+API_DOC_ASSEMBLIES = ('RevitAPI', 'RevitAPIUI')
+API_DOC_DIR = None
+
+# snapshot (rph.crawl) : member kinds followed by the crawler, and items read per collection
+CRAWL_KINDS = ('Class', 'List', 'Map')
+CRAWL_ITEMS = 50
+
+# global search (rph.find) : assemblies indexed first, and max number of results
+FIND_FIRST = ('RevitAPI', 'Autodesk.')
+FIND_LIMIT = 200
+
+# member kinds with a value that depends only on the type
+STATIC_KINDS = ('Func', 'Event')
+
+# descriptors of the members read only on demand in lazy mode (property getters)
+LAZY_DESCRIPTORS = ('getset_descriptor', 'indexer#', 'property')
+
+# descriptors of the methods, classified without reading the member
+METHOD_DESCRIPTORS = ('method_descriptor', 'function', 'builtin_function_or_method')
+
+# default mode of the explorer : True to read property values only when displayed
+LAZY_VALUES = False
+
+# default mode of the explorer : True to extract the members on a worker thread
+BACKGROUND_LOADING = True
+
+# speculative prefetch : the types of the hovered properties are warmed in the member
+# cache on a worker thread, levels of property types followed (0 to disable) and ms per row
+PREFETCH_DEPTH = 1
+PREFETCH_BUDGET_MS = 200
+
+# number of rows posted to the grid at once by the worker thread
+LOAD_BATCH_SIZE = 50
+
+# navigation : pages kept in the back/forward history, and pages keeping their rows
+HISTORY_SIZE = 50
+PAGE_CACHE_SIZE = 10
+
+# member kinds of the collections, summarised with a count and the first items
+COLLECTION_KINDS = ('List', 'Map')
+COLLECTION_PREVIEW = 5
+
+# items read at once when a collection is opened, and name of the row to read more
+ITEMS_PAGE_SIZE = 100
+MORE_ITEMS = '...'
+
+# default mode of the explorer : True to time each getattr (column ms)
+TIMING_MODE = False
+TIME_COLUMN = 4
+
+# default mode of the explorer : True to read again the values of an element
+# when its document changes (Watch checkbox)
+WATCH_MODE = False
+
+# column of the class declaring each member
+OWNER_COLUMN = 5
+
+# headers of the Name, Type, Value and Infos columns, for member pages and diff pages
+HEADERS = ('Name', 'Type', 'Value', 'Infos')
+DIFF_HEADERS = ('Name', 'Type', 'Value a', 'Value b')
+DIFF_COLOR = Color.MistyRose
+
+# time budgets (ms) : a getter over MEMBER_BUDGET_MS is marked slow and not read
+# again for this type, values are no longer read after OBJECT_BUDGET_MS
+MEMBER_BUDGET_MS = 250
+OBJECT_BUDGET_MS = 2000
+# default time budget (ms) of a crawl, the objects left are not written
+CRAWL_BUDGET_MS = 30000
 
 
 #               #               #
@@ -46,11 +183,32 @@ from System.Windows.Forms import (Form, ToolTip, Padding, SplitContainer, CheckB
 class RevitPythonHelper(Form):
     '''
     '''
-    def __init__(self, ref_obj):
+    def __init__(self, ref_obj, lazy=LAZY_VALUES, background=BACKGROUND_LOADING, timing=TIMING_MODE,
+                 watch=WATCH_MODE):
         super(RevitPythonHelper, self).__init__()
         
-        self.ref_obj = ref_obj
-        self.filter_sys_memb = True
+        self.ref_obj = None
+        self.typeinfo = None
+        self.page = None
+        self.history = []
+        self.position = -1
+        self.pages = LRUCache(PAGE_CACHE_SIZE, on_evict=Page.release)
+        self.hidden = frozenset()
+        self.lazy = lazy
+        self.background = background
+        self.loader = None
+        self.deadline = None
+        self.rows = []
+        self.view = []
+        self.index = MemberIndex()
+        self.values = {}
+        self.timing = timing
+        self.timings = {}
+        self.sort_order = []
+        self.sort_keys = {}
+        self.watch = watch
+        self.watched = None
+        self.watch_handler = self.on_document_changed
         
         self.Size = Size(650, 800)
         self.Text = 'Explorer'
@@ -71,7 +229,10 @@ class RevitPythonHelper(Form):
         self.table = DataGridView()
         self.table.Dock = DockStyle.Fill
         self.table.RowHeadersVisible = False
-        self.table.AutoSizeRowsMode = DataGridViewAutoSizeRowsMode.AllCellsExceptHeaders
+        self.table.VirtualMode = True
+        self.table.ReadOnly = True
+        self.table.AllowUserToAddRows = False
+        self.table.AutoSizeRowsMode = DataGridViewAutoSizeRowsMode.DisplayedCellsExceptHeaders
         self.table.RowTemplate.Height = 30
         self.table.SelectionMode = DataGridViewSelectionMode.RowHeaderSelect
         self.table.DefaultCellStyle.WrapMode = DataGridViewTriState.True
@@ -100,8 +261,23 @@ class RevitPythonHelper(Form):
         col4.AutoSizeMode = DataGridViewAutoSizeColumnMode.Fill
         col4.FillWeight = 60
 
-        self.table.Columns.AddRange((col1,col2, col3, col4))
+        col5 = DataGridViewTextBoxColumn()
+        col5.HeaderText = 'ms'
+        col5.AutoSizeMode = DataGridViewAutoSizeColumnMode.Fill
+        col5.FillWeight = 7
+        col5.DefaultCellStyle.Format = 'N2'
+        col5.DefaultCellStyle.Alignment = DataGridViewContentAlignment.MiddleRight
+        col5.Visible = timing
+
+        col6 = DataGridViewTextBoxColumn()
+        col6.HeaderText = 'Owner'
+        col6.AutoSizeMode = DataGridViewAutoSizeColumnMode.Fill
+        col6.FillWeight = 10
+
+        self.table.Columns.AddRange((col1,col2, col3, col4, col5, col6))
         self.table.AutoGenerateColumns = False
+        for col in self.table.Columns:
+            col.SortMode = DataGridViewColumnSortMode.Programmatic
 
         self.panright.Panel1.Controls.Add(self.top_info)
         self.panright.Panel2.Controls.Add(self.table)
@@ -112,11 +288,59 @@ class RevitPythonHelper(Form):
         self.toolpan.Dock = DockStyle.Top
         self.toolpan.Height = 25
 
+        self.back = Button()
+        self.back.Parent = self.toolpan
+        self.back.Text = '<'
+        self.back.Width = 25
+        self.tooltips.SetToolTip(self.back, 'Back')
+
+        self.forward = Button()
+        self.forward.Parent = self.toolpan
+        self.forward.Text = '>'
+        self.forward.Width = 25
+        self.tooltips.SetToolTip(self.forward, 'Forward')
+
         self.check = CheckBox()
         self.check.Parent = self.toolpan
         self.check.Text = "Hide Sys"
         self.check.Checked = True
 
+        self.level = ComboBox()
+        self.level.Parent = self.toolpan
+        self.level.DropDownStyle = ComboBoxStyle.DropDownList
+        self.level.Width = 120
+        self.tooltips.SetToolTip(self.level, 'Show the members declared down to this class')
+
+        self.check_timing = CheckBox()
+        self.check_timing.Parent = self.toolpan
+        self.check_timing.Text = "Timing"
+        self.check_timing.Width = 60
+        self.check_timing.Checked = timing
+
+        self.check_watch = CheckBox()
+        self.check_watch.Parent = self.toolpan
+        self.check_watch.Text = "Watch"
+        self.check_watch.Width = 60
+        self.check_watch.Checked = watch
+        self.tooltips.SetToolTip(self.check_watch, 'Refresh the values when the element is modified')
+
+        self.export = Button()
+        self.export.Parent = self.toolpan
+        self.export.Text = 'CSV'
+        self.export.Width = 40
+        self.tooltips.SetToolTip(self.export, 'Dump the timings to a csv file')
+
+        self.search = TextBox()
+        self.search.Parent = self.toolpan
+        self.search.Width = 200
+        self.tooltips.SetToolTip(self.search, 'Filter the members (name or doc)')
+
+        self.find = Button()
+        self.find.Parent = self.toolpan
+        self.find.Text = 'Find'
+        self.find.Width = 40
+        self.tooltips.SetToolTip(self.find, 'Search the text in the types and members of all the assemblies')
+
         self.close = Button()
         self.close.Parent = self
         self.close.Dock = DockStyle.Bottom
@@ -125,18 +349,34 @@ class RevitPythonHelper(Form):
 
         # LOAD DATAS
 
-        self.update_info(extract_main(self.ref_obj))
-        self.update_table(extract_members(self.ref_obj, self.filter_sys_memb))
+        self.table.CellValueNeeded += self.on_cell_value_needed
+        self.table.CellFormatting += self.on_cell_formatting
+
+        api_docs.start()
         self.Show()
+        self.navigate(new_page(ref_obj))
+        name_index.start()
 
         # EVENTS 
 
         self.top_info.LinkClicked += self.on_link_clicked
         self.check.CheckedChanged  += self.on_hide_member_clicked
+        self.level.SelectedIndexChanged += self.on_level_changed
+        self.check_timing.CheckedChanged += self.on_timing_clicked
+        self.check_watch.CheckedChanged += self.on_watch_clicked
+        self.export.Click += self.on_export_clicked
+        self.search.TextChanged += self.on_search_changed
+        self.find.Click += self.on_find_clicked
         self.close.Click += self.on_close
+        self.back.Click += self.on_back
+        self.forward.Click += self.on_forward
+        self.FormClosing += self.on_form_closing
+        self.FormClosed += self.on_form_closed
         self.table.MouseEnter += self.get_focus
         self.table.CellContentDoubleClick += self.on_val_double_click
-        #self.table.SortCompare += self.sort_by_name  # TODO double sort 
+        self.table.CellMouseEnter += self.on_cell_mouse_enter
+        self.table.SelectionChanged += self.on_selection_changed
+        self.table.ColumnHeaderMouseClick += self.on_header_click
         
     def update_info(self, text):
         '''Display main info in the richtextbox
@@ -148,70 +388,1094 @@ class RevitPythonHelper(Form):
         self.top_info.SelectionFont = Font(self.top_info.Font, FontStyle.Bold)
         self.top_info.SelectionLength = 0
 
+    def navigate(self, page):
+        '''Show a new page, the pages after the current one are dropped
+            arg : Page
+        '''
+        del self.history[self.position + 1:]
+        self.history.append(page)
+        del self.history[:-HISTORY_SIZE]
+        self.position = len(self.history) - 1
+        self.show_page(page)
+
+    def show_page(self, page):
+        '''Display a page, its rows are reused while it stays in the page cache
+            arg : Page
+        '''
+        if self.loader:
+            self.loader.cancel()
+            self.loader = None
+        self.page = page
+        self.ref_obj = page.resolve(hold=True)
+        # one lookup in the member cache per page shown, the rows use this one
+        self.typeinfo = None if page.source else type_info(self.ref_obj)
+        self.values = page.values
+        self.timings = page.timings
+        self.pages.put(page, page)
+        
+        if page.info is None:
+            page.info = page.summary or extract_main(self.ref_obj, self.typeinfo)
+        self.update_info(page.info)
+        self.Text = page.title
+        for col, header in enumerate(page.headers or HEADERS):
+            self.table.Columns[col].HeaderText = header
+        self.back.Enabled = self.position > 0
+        self.forward.Enabled = self.position < len(self.history) - 1
+        self.update_levels()
+        self.start_watch()
+        
+        if page.rows is not None:
+            self.update_table(page.rows)
+            page.rows = self.rows
+        else:
+            self.load_members()
+
+    def update_levels(self):
+        '''List the base classes of the page in the level combobox, all members shown
+        '''
+        if self.page.hierarchy is None:
+            if self.page.source or self.page.collection:
+                self.page.hierarchy = []
+            else:
+                self.page.hierarchy = [cls.__name__ for cls in type_hierarchy(self.ref_obj)]
+        self.level.Items.Clear()
+        for name in self.page.hierarchy:
+            self.level.Items.Add(name)
+        self.level.Enabled = bool(self.page.hierarchy)
+        if self.page.hierarchy:
+            self.level.SelectedIndex = len(self.page.hierarchy) - 1
+        self.update_hidden()
+
+    def update_hidden(self):
+        '''Set of the members hidden by Hide Sys and by the level combobox,
+            the owners come from the hierarchy cache, no dir() per toggle
+        '''
+        hidden = set(sys_members()) if self.check.Checked else set()
+        level = self.level.SelectedIndex
+        if 0 <= level < len(self.page.hierarchy) - 1:
+            hidden.update(member for member, depth in self.page_owners().items() if depth > level)
+        self.hidden = hidden
+
+    def page_owners(self):
+        '''dict member -> depth of the declaring class for the current page
+        '''
+        if self.page.owners is None:
+            if self.page.hierarchy:
+                self.page.owners = member_owners(self.ref_obj, self.typeinfo)
+            else:
+                self.page.owners = {}
+        return self.page.owners
+
     def update_table(self, sourcelist):
-        '''Populate listview with selected  member or group
+        '''Populate the virtual grid, cells are read from self.rows when displayed
             arg: a list of tuples (member, type, val, docstring)
         '''
-        self.table.Rows.Clear()
-        self.table.SuspendLayout()
-        for member, mtype, val, doc in sourcelist:
-            self.table.Rows.Add(member, mtype, val, doc)
-        self.table.ResumeLayout()
+        self.rows = [list(row) for row in sourcelist]
+        self.index.clear()
+        self.index.add(self.rows)
+        self.sort_keys = dict((id(row), sort_key(row)) for row in self.rows)
+        if self.sort_order:
+            self.sort_rows()
+        self.refresh_view()
+
+    def refresh_view(self, grow=False):
+        '''Show the rows matching the search box, the rows are not rebuilt
+            arg: grow : bool True when rows were only added (loader batches), the
+                 grid keeps its scroll position, current cell and selection
+        '''
+        hits = self.index.search(self.search.Text)
+        hidden = self.hidden
+        if hits is None and not hidden:
+            self.view = self.rows
+        elif hits is None:
+            self.view = [row for row in self.rows if row[0] not in hidden]
+        else:
+            self.view = [row for row in self.rows if id(row) in hits and row[0] not in hidden]
+        if not (grow and len(self.view) >= self.table.RowCount):
+            self.table.RowCount = 0
+        self.table.RowCount = len(self.view)
+        self.table.Invalidate()
+
+    def load_members(self):
+        '''Extract the members of ref_obj, in background mode the rows are
+            posted by a MemberLoader and the form stays responsive
+        '''
+        if self.loader:
+            self.loader.cancel()
+            self.loader = None
+        self.deadline = time.clock() + OBJECT_BUDGET_MS / 1000.0
+            
+        if self.page.source:
+            self.page.items = OrderedDict()
+            self.update_table(self.page.source(self.page))
+            self.page.store(self.rows)
+            
+        elif self.page.collection:
+            self.load_items()
+            
+        elif self.background:
+            self.update_table([])
+            self.Text = self.page.title + ' (loading...)'
+            self.loader = MemberLoader(self, self.ref_obj, self.typeinfo, False)
+            self.loader.start()
+        else:
+            self.update_table(extract_members(self.ref_obj, False, self.lazy,
+                                              self.timings if self.timing else None,
+                                              info=self.typeinfo, pending=True))
+            self.page.store(self.rows)
+
+    def load_items(self, more=False):
+        '''Show the items of a collection page, the next ones are read only
+            when the MORE_ITEMS row is double-clicked
+            arg: more : bool True to add the next items to the current ones
+        '''
+        if more:
+            rows = [row for row in self.rows if row[0] != MORE_ITEMS]
+        else:
+            self.page.cursor = None
+            rows = []
+        new_rows = extract_items(self.page)
+        rows.extend(new_rows)
+        if len(new_rows) == ITEMS_PAGE_SIZE:
+            rows.append((MORE_ITEMS, 'More', 'Double-click to read the next items', ''))
+        self.update_table(rows)
+        self.page.store(self.rows)
+
+    def append_rows(self, batch, done=False):
+        '''Add a batch of rows posted by the loader (UI thread)
+            args:
+                batch : a list of tuples (member, type, val, docstring)
+                done : bool True for the last batch
+        '''
+        rows = [list(row) for row in batch]
+        if not self.lazy:
+            # getters may touch the Revit API, read them on this thread,
+            # once over budget the values are read when displayed
+            for row in rows:
+                if row[2] is PENDING and time.clock() < self.deadline:
+                    self.resolve_row(row)
+        self.rows.extend(rows)
+        self.index.add(rows)
+        self.sort_keys.update((id(row), sort_key(row)) for row in rows)
+        if self.sort_order:
+            self.sort_rows()
+        self.refresh_view(grow=True)
+        if done:
+            self.loader = None
+            self.Text = self.page.title
+            self.page.store(self.rows)
+
+    def start_watch(self):
+        '''Subscribe to DocumentChanged for the element of the page, the
+            previous subscription is dropped
+        '''
+        self.stop_watch()
+        if self.watch and not (self.page.source or self.page.collection):
+            self.watched = watched_element(self.ref_obj)
+            if self.watched is not None:
+                self.watched[0].DocumentChanged += self.watch_handler
+
+    def stop_watch(self):
+        '''Unsubscribe from DocumentChanged, nothing is read after it
+        '''
+        if self.watched is not None:
+            self.watched[0].DocumentChanged -= self.watch_handler
+            self.watched = None
+
+    def on_document_changed(self, sender, event):
+        '''Read again the values when the element of the page is modified (UI thread),
+            the document and the id saved by start_watch are compared, the element
+            itself is not touched before the deletion check
+        '''
+        if self.watched is None:
+            return
+        app, document, element_id = self.watched
+        if not event.GetDocument().Equals(document):
+            return
+        if event.GetDeletedElementIds().Contains(element_id):
+            self.stop_watch()
+            self.Text = self.page.title + ' (deleted)'
+            return
+        if event.GetModifiedElementIds().Contains(element_id):
+            self.refresh_values()
+
+    def refresh_values(self):
+        '''Read again the values already displayed and repaint only the
+            changed cells, the rows are updated in place (no extraction)
+        '''
+        if self.loader or self.page.rows is None:
+            return
+        info = self.typeinfo
+        positions = None
+        for row in self.rows:
+            if row[2] is PENDING or row[1] in STATIC_KINDS or row[1] == 'slow':
+                continue
+            new_row = read_member(self.ref_obj, row[0], info)
+            changed = [col for col in range(len(new_row)) if row[col] != new_row[col]]
+            if not changed:
+                continue
+            self.values[row[0]] = new_row
+            row[:] = new_row
+            self.sort_keys[id(row)] = sort_key(row)
+            if positions is None:
+                positions = dict((id(view_row), index) for index, view_row in enumerate(self.view))
+            if id(row) in positions:
+                for col in changed:
+                    self.table.InvalidateCell(col, positions[id(row)])
+
+    def sort_rows(self):
+        '''Sort the backing list on the columns of sort_order, one stable sort
+            per column from the last key to the first, with the precomputed keys
+        '''
+        keys = self.sort_keys
+        timings = self.timings
+        order = list(self.sort_order)
+        if all(col != 0 for col, reverse in order):
+            order.append((0, False))
+        for col, reverse in reversed(order):
+            if col == TIME_COLUMN:
+                self.rows.sort(key=lambda row: timings.get(row[0], -1.0), reverse=reverse)
+            elif col == OWNER_COLUMN:
+                owners = self.page_owners()
+                self.rows.sort(key=lambda row: owners.get(row[0], -1), reverse=reverse)
+            else:
+                self.rows.sort(key=lambda row: keys[id(row)][col], reverse=reverse)
     
+    def on_cell_value_needed(self, sender, event):
+        '''Give the grid the value of a displayed cell
+        '''
+        if event.RowIndex < len(self.view):
+            row = self.view[event.RowIndex]
+            if row[2] is PENDING:
+                self.resolve_row(row)
+            if event.ColumnIndex == TIME_COLUMN:
+                event.Value = self.timings.get(row[0])
+            elif event.ColumnIndex == OWNER_COLUMN:
+                depth = self.page_owners().get(row[0])
+                event.Value = None if depth is None else self.page.hierarchy[depth]
+            else:
+                event.Value = row[event.ColumnIndex]
+
+    def on_cell_formatting(self, sender, event):
+        '''Highlight the rows listed in page.highlight (diff)
+        '''
+        if self.page.highlight and event.RowIndex < len(self.view):
+            if self.view[event.RowIndex][0] in self.page.highlight:
+                event.CellStyle.BackColor = DIFF_COLOR
+
+    def resolve_row(self, row):
+        '''Read the value of a lazy row, values are kept for the life of the form
+            arg: a row of self.rows, updated in place
+        '''
+        member = row[0]
+        if member not in self.values:
+            self.values[member] = read_member(self.ref_obj, member, self.typeinfo,
+                                              self.timings if self.timing else None)
+        row[:] = self.values[member]
+        self.sort_keys[id(row)] = sort_key(row)
+
+    def force_row(self, row):
+        '''Read the value of a row marked slow, the member is no longer
+            marked if the getter is fast this time
+            arg: a row of self.rows, updated in place
+        '''
+        member = row[0]
+        self.values[member] = read_member(self.ref_obj, member, self.typeinfo,
+                                          self.timings if self.timing else None, force=True)
+        row[:] = self.values[member]
+        self.sort_keys[id(row)] = sort_key(row)
+
+    def on_header_click(self, sender, event):
+        '''Sort on the clicked column then on the previous one (Type then Name...),
+            a second click on the same header reverses the order
+        '''
+        col = event.ColumnIndex
+        if self.sort_order and self.sort_order[0][0] == col:
+            self.sort_order[0] = (col, not self.sort_order[0][1])
+        else:
+            previous = [key for key in self.sort_order if key[0] != col]
+            self.sort_order = [(col, False)] + previous[:1]
+        self.sort_rows()
+        self.refresh_view()
+        for column in sender.Columns:
+            column.HeaderCell.SortGlyphDirection = SortOrder.None
+        sender.Columns[col].HeaderCell.SortGlyphDirection = (
+            SortOrder.Descending if self.sort_order[0][1] else SortOrder.Ascending)
+
     def on_close(self, sender, event):
         '''Get out! 
         '''
         self.Close()
         
+    def on_form_closing(self, sender, event):
+        '''Stop the loader, nothing must be posted to a closed form
+        '''
+        if self.loader:
+            self.loader.cancel()
+            self.loader = None
+        self.stop_watch()
+        self.pages.clear()
+        del self.history[:]
+        
+    def on_form_closed(self, sender, event):
+        '''Save the member cache for the next sessions
+        '''
+        save_cache()
+        
+    def on_back(self, sender, event):
+        ''' Show the previous page of the history
+        '''
+        if self.position > 0:
+            self.position -= 1
+            self.show_page(self.history[self.position])
+        
+    def on_forward(self, sender, event):
+        ''' Show the next page of the history
+        '''
+        if self.position < len(self.history) - 1:
+            self.position += 1
+            self.show_page(self.history[self.position])
+        
     def on_link_clicked(self, sender, event):
         ''' Open tab in default browser
         '''
         webbrowser.open_new_tab(event.LinkText)
     
+    def on_timing_clicked(self, sender, event):
+        ''' Show the ms column, the values are read again to be timed
+        '''
+        self.timing = sender.Checked
+        self.table.Columns[TIME_COLUMN].Visible = self.timing
+        if self.timing and not self.timings:
+            self.values.clear()
+            self.load_members()
+        
+    def on_watch_clicked(self, sender, event):
+        ''' Watch the element of the page, its values follow the document changes
+        '''
+        self.watch = sender.Checked
+        self.start_watch()
+        
+    def on_export_clicked(self, sender, event):
+        ''' Dump the timings of the page to a csv file in %temp%
+        '''
+        path = os.path.join(os.path.expandvars('%temp%'),
+                            'rph_timings_{0}.csv'.format(type(self.ref_obj).__name__))
+        write_timings(path, self.rows, self.timings)
+        print('Timings saved in ' + path)
+        
+    def on_find_clicked(self, sender, event):
+        ''' Show the types and members of all the assemblies matching the search box
+        '''
+        query = self.search.Text.strip()
+        if query:
+            self.navigate(Page(query, title='Find : ' + query, source=find_rows,
+                summary='Find : {0}\nDouble-click to open the type'.format(query)))
+        
+    def on_search_changed(self, sender, event):
+        ''' Filter the displayed rows with the index, no extraction
+        '''
+        self.refresh_view()
+    
     def on_hide_member_clicked(self, sender, event):
         ''' Update views to hide/show object base members
         '''
-        self.filter_sys_memb = sender.Checked
-        self.update_table(extract_members(self.ref_obj, self.filter_sys_memb))
+        self.update_hidden()
+        self.refresh_view()
+        
+    def on_level_changed(self, sender, event):
+        ''' Hide the members declared above the selected class
+        '''
+        self.update_hidden()
+        self.refresh_view()
         
     def on_val_double_click(self, sender, event):
-        ''' Open a new form to display clicked member
+        ''' Display the clicked member in this form, Ctrl + double-click for a new form
         '''
         try:
             if event.ColumnIndex == 0: 
-                member = sender.Rows[event.RowIndex].Cells[event.ColumnIndex].Value
-                new_ref = getattr(self.ref_obj, member)
-                RevitPythonHelper(new_ref)
+                member, mtype = self.view[event.RowIndex][:2]
+                if self.page.collection and member == MORE_ITEMS:
+                    self.load_items(more=True)
+                    return
+                if mtype == 'slow' and self.typeinfo is not None:
+                    self.force_row(self.view[event.RowIndex])
+                    self.table.InvalidateRow(event.RowIndex)
+                    return
+                
+                if self.page.items is not None:
+                    new_ref = self.page.items[member]
+                else:
+                    new_ref = getattr(self.ref_obj, member)
+                
+                prefetcher.navigated(new_ref)
+                if Control.ModifierKeys & Keys.Control == Keys.Control:
+                    RevitPythonHelper(new_ref, self.lazy, self.background, watch=self.watch)
+                else:
+                    self.navigate(new_page(new_ref, self.page, member, mtype,
+                                           weak=self.page.items is None))
         except:
             print("Can't reach this reference")
             
+    def on_cell_mouse_enter(self, sender, event):
+        ''' Prefetch the type of the hovered property
+        '''
+        self.prefetch_row(event.RowIndex)
+        
+    def on_selection_changed(self, sender, event):
+        ''' Prefetch the type of the selected property
+        '''
+        if sender.CurrentCell is not None:
+            self.prefetch_row(sender.CurrentCell.RowIndex)
+            
+    def prefetch_row(self, index):
+        ''' Schedule the declared type of a property row in the prefetcher,
+            read from the descriptor : the getter is not called
+            arg: index of the row in the view
+        '''
+        if (not 0 <= index < len(self.view) or self.page.source or self.page.collection
+                or isinstance(self.ref_obj, (type, ModuleType))):
+            return
+        desc = class_attribute(type(self.ref_obj), self.view[index][0])
+        if type(desc).__name__ == 'getset_descriptor':
+            try:
+                prefetcher.schedule(desc.PropertyType)
+            except Exception:
+                pass
+            
     def get_focus(self, sender, event):
         '''Add convenient focus for scroll in datagrid
         '''
         if not sender.Focused:
             sender.Focus()
 
-    def sort_by_name(self, sender, event):
-        ''' Overide the automatic grid sort
+
+class Page(object):
+    ''' One object displayed in the explorer, with its rows once extracted.
+        The object is held while the page is in the page cache, then weakly when the
+        type allows it (child pages), a released object is read again from the parent
+        page with getattr.
+        A collection page lists the items, read ITEMS_PAGE_SIZE at a time from cursor.
+        A page with a source gets its rows from source(page) instead of the members,
+        (search results...) and lists the objects to open in items.
+    '''
+    def __init__(self, obj, parent=None, member=None, collection=False, weak=True,
+                 title=None, source=None, summary=None, headers=None, highlight=None):
+        self.parent = parent
+        self.member = member
+        self.collection = collection
+        self.source = source
+        self.summary = summary
+        self.headers = headers
+        self.highlight = highlight
+        self.weak = weak and parent is not None
+        self.info = None
+        self.rows = None
+        self.hierarchy = None
+        self.owners = None
+        self.values = {}
+        self.timings = {}
+        self.cursor = None
+        self.items = None
+        self._obj = None
+        self._ref = None
+        self.bind(obj)
+        
+        if title:
+            self.title = title
+        elif parent is None:
+            self.title = 'Explorer - ' + type(obj).__name__
+        else:
+            self.title = '{0}.{1}'.format(parent.title, member)
+        
+    def bind(self, obj, hold=True):
+        ''' keep obj, strongly if hold (page in the page cache) or if the page
+            can't be weak, else with a weakref
+        '''
+        self._obj = obj if hold or not self.weak else None
+        self._ref = None
+        if self.weak:
+            try:
+                self._ref = weakref.ref(obj)
+            except TypeError:
+                self._obj = obj
+            
+    def resolve(self, hold=False):
+        ''' return the object of the page, read again from the parent if released
+            arg : hold : bool True to hold the object strongly (page shown)
+        '''
+        if self._obj is not None or self._ref is None:
+            obj = self._obj
+        else:
+            obj = self._ref()
+            if obj is None:
+                obj = getattr(self.parent.resolve(), self.member)
+                self.bind(obj, hold)
+                return obj
+        if hold:
+            self._obj = obj
+        return obj
+        
+    def store(self, rows):
+        ''' keep the extracted rows to show the page again without extraction
+        '''
+        self.rows = rows
+        
+    def release(self):
+        ''' drop the rows when the page leaves the page cache
+        '''
+        self.rows = None
+        self.owners = None
+        self.values = {}
+        self.timings = {}
+        self.info = None
+        self.cursor = None
+        self.items = None
+        if self._ref is not None:
+            self._obj = None   # weakly held until shown again
+
+
+def watched_element(obj):
+    ''' return (Application raising DocumentChanged, Document, ElementId) for obj,
+        None if obj is not an element of a document
+        arg : ref to object
+    '''
+    try:
+        document = obj.Document
+        return (document.Application, document, obj.Id)
+    except Exception:
+        return None
+
+
+def new_page(obj, parent=None, member=None, mtype=None, weak=True):
+    ''' return the Page displaying obj : members, collection items or snapshot node
+        args :
+            obj : ref to object
+            parent : Page of the parent object, None for a root page
+            member : name of obj in the parent
+            mtype : kind of the member in the parent row
+            weak : bool False to hold obj strongly
+    '''
+    if isinstance(obj, SnapshotNode):
+        return Page(obj, parent, member, weak=False, title=obj.path,
+                    source=snapshot_rows, summary=obj.info)
+    if isinstance(obj, MemberDiff):
+        return Page(obj, parent, member, weak=False, title=obj.title, source=diff_rows,
+                    summary=obj.summary(), headers=DIFF_HEADERS, highlight=obj.changed)
+    return Page(obj, parent, member, collection=mtype in COLLECTION_KINDS, weak=weak)
+
+
+class MemberIndex(object):
+    ''' Search index of the rows of a grid, the name and the docstring of each row
+        are lowered once. A query extending the previous one is only checked
+        against the previous hits, so typing narrows the search incrementally.
+    '''
+    def __init__(self):
+        self.texts = OrderedDict()
+        self.last_query = None
+        self.last_hits = None
+        
+    def clear(self):
+        self.texts.clear()
+        self.last_query = None
+        self.last_hits = None
+        
+    def add(self, rows):
+        ''' index new rows, arg : a list of rows (member, type, val, docstring)
+        '''
+        for row in rows:
+            self.texts[id(row)] = u'{0}\n{1}'.format(row[0], row[3] or '').lower()
+        self.last_query = None
+        
+    def search(self, query):
+        ''' return the set of id() of the matching rows, None if no query
+            arg : text typed by the user
         '''
-        event.SortResult = System.String.Compare(
-            event.CellValue1.ToString(), event.CellValue2.ToString())
+        query = query.strip().lower()
+        if not query:
+            return None
+            
+        if self.last_query and query.startswith(self.last_query):
+            candidates = self.last_hits
+        else:
+            candidates = self.texts
+            
+        texts = self.texts
+        hits = set(key for key in candidates if query in texts[key])
+        self.last_query = query
+        self.last_hits = hits
+        return hits
+
+
+class MemberLoader(object):
+    ''' Run the reflection and the classification of the members on a worker thread,
+        rows are posted to the form by batches with BeginInvoke.
+        No member is read on obj (see peek_member), every value is left PENDING and
+        the form reads them on the UI thread : the Revit API can't be called from
+        another thread, even for static getters (h(XYZ)).
+    '''
+    def __init__(self, form, obj, info, filtersys):
+        self.form = form
+        self.obj = obj
+        self.info = info
+        self.filtersys = filtersys
+        self.cancelled = False
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        
+    def start(self):
+        self.thread.start()
+        
+    def cancel(self):
+        self.cancelled = True
+        
+    def run(self):
+        batch = []
+        try:
+            info = self.info
+            for member in member_names(self.obj, info, self.filtersys):
+                if self.cancelled:
+                    return
+                batch.append(peek_member(self.obj, member, info))
+                if len(batch) >= LOAD_BATCH_SIZE:
+                    self.post(batch)
+                    batch = []
+                    
+        except Exception as error:
+            batch.append(('n/a', 'n/a', '', str(error)))
+        self.post(batch, True)
             
-        if not(event.SortResult and event.Column.Index == 0):
-            event.SortResult = System.String.Compare(
-            sender.Rows[event.RowIndex1].Cells[0].Value.ToString(),
-            sender.Rows[event.RowIndex2].Cells[0].Value.ToString())
-        event.Handled = True
+    def post(self, batch, done=False):
+        ''' send a batch to the UI thread, unless the form is gone
+        '''
+        form = self.form
+        if self.cancelled or form.IsDisposed:
+            return
+        def deliver():
+            if not self.cancelled:
+                form.append_rows(batch, done)
+        try:
+            form.BeginInvoke(Action(deliver))
+        except Exception:
+            self.cancelled = True
+
+
+#               #               #
+#             CACHE
+#               #               #
+
+class LRUCache(object):
+    ''' Bounded mapping, the least recently used key is dropped when full
+        (on_evict is called with its value), hits and misses are counted
+        to check the cache is worth it
+    '''
+    def __init__(self, maxsize=128, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def __len__(self):
+        return len(self._data)
+        
+    def __contains__(self, key):
+        return key in self._data
+        
+    def get(self, key, default=None):
+        ''' return the value and mark it as the most recent one
+        '''
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+        
+    def put(self, key, value):
+        ''' store the value, evict the oldest keys beyond maxsize
+        '''
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                key, old = self._data.popitem(last=False)
+                if self.on_evict:
+                    self.on_evict(old)
+            
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            
+    def values(self):
+        with self._lock:
+            return list(self._data.values())
+        
+    def stats(self):
+        ''' return a dict with hits, misses and size, for the REPL
+        '''
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._data), 'maxsize': self.maxsize}
+
+
+class TypeInfo(object):
+    ''' Static part of the members of a type, shared by all its instances
+        names : result of dir() when it can't change between instances
+        members : dict member -> (type, val, docstring, value type name, dynamic)
+        slow : dict member -> ms of the getters over MEMBER_BUDGET_MS, not saved
+        owners : dict member -> depth of the declaring class (see member_owners)
+        doc : docstring of the type for the top panel
+        persist : (assembly full name, type key) when saved by the DiskCache
+        api_pending : True if docs were read before the offline doc was ready
+    '''
+    def __init__(self, static):
+        self.static = static
+        self.names = None
+        self.members = {}
+        self.slow = {}
+        self.doc = None
+        self.owners = None
+        self.persist = None
+        self.api_pending = False
+        
+    def dump(self):
+        # slow is kept for the session only, a getter slow once (regeneration...)
+        # must be read again in the next sessions
+        return {'names': self.names, 'members': self.members, 'doc': self.doc}
+        
+    def load(self, data):
+        self.names = data['names']
+        self.members = dict((member, tuple(entry)) for member, entry in data['members'].items())
+        self.doc = data['doc']
+
+
+class DiskCache(object):
+    ''' Copy of the TypeInfo of the CLR types saved between sessions, one json file
+        per assembly named after its version : a Revit upgrade starts new files.
+        A file is read when the first type of its assembly is needed.
+    '''
+    def __init__(self, folder):
+        self.folder = folder
+        self.assemblies = {}
+        self.paths = {}
+        self.dirty = set()
+        self._lock = threading.Lock()
+        
+    def types(self, assembly):
+        ''' return the dict type key -> TypeInfo data of an assembly, read once
+            arg : assembly full name
+        '''
+        with self._lock:
+            if assembly not in self.assemblies:
+                self.assemblies[assembly] = {}
+                try:
+                    with open(self.paths[assembly]) as cachefile:
+                        data = json.load(cachefile)
+                    if data['assembly'] == assembly and data.get('format') == DISK_CACHE_FORMAT:
+                        self.assemblies[assembly] = data['types']
+                except Exception:
+                    pass  # no cache yet, or unreadable : rebuilt on save
+            return self.assemblies[assembly]
+        
+    def fill(self, info, pytype, members_of_type):
+        ''' register a new TypeInfo and load its saved data if any
+            args :
+                info : TypeInfo
+                pytype : the type
+                members_of_type : bool True if the members are read on the type itself
+        '''
+        try:
+            clrtype = clr.GetClrType(pytype)
+            assembly = clrtype.Assembly
+            if assembly.IsDynamic:
+                return  # python classes
+        except Exception:
+            return
+        name = assembly.GetName()
+        self.paths[assembly.FullName] = os.path.join(
+            self.folder, '{0}_{1}.json'.format(name.Name, name.Version))
+        prefix = 'class:' if members_of_type else ''
+        info.persist = (assembly.FullName, prefix + clrtype.FullName)
+        
+        data = self.types(assembly.FullName).get(info.persist[1])
+        if data:
+            info.load(data)
+            
+    def keep(self, info):
+        ''' copy a TypeInfo in its assembly data, to be written by save
+        '''
+        if info.persist is None or info.api_pending:
+            return
+        assembly, key = info.persist
+        try:
+            data = json.loads(json.dumps(info.dump()))
+        except (TypeError, ValueError):
+            return  # a value can't be saved, the type stays in memory only
+        types = self.types(assembly)
+        if types.get(key) != data:
+            types[key] = data
+            self.dirty.add(assembly)
+            
+    def save(self, infos):
+        ''' write the assemblies with new or updated types
+            arg : list of TypeInfo
+        '''
+        for info in infos:
+            self.keep(info)
+        if not self.dirty:
+            return
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        with self._lock:
+            for assembly in self.dirty:
+                with open(self.paths[assembly], 'w') as cachefile:
+                    json.dump({'assembly': assembly, 'format': DISK_CACHE_FORMAT,
+                               'types': self.assemblies[assembly]},
+                              cachefile, separators=(',', ':'))
+            self.dirty.clear()
+
+
+def type_info(obj):
+    ''' return the cached TypeInfo of the object, create it on first call,
+        a class and its instances have their own entries
+        arg : ref of object
+    '''
+    if isinstance(obj, type):
+        key = ('class', obj)
+    elif isinstance(obj, ModuleType):
+        key = obj
+    else:
+        key = type(obj)
+        
+    info = member_cache.get(key)
+    if info is None:
+        # no instance dict (CLR objects) means the same members for all instances
+        static = isinstance(obj, type) or not hasattr(obj, '__dict__')
+        info = TypeInfo(static)
+        if static and disk_cache and not isinstance(obj, ModuleType):
+            disk_cache.fill(info, owner_type(obj), isinstance(obj, type))
+        member_cache.put(key, info)
+    return info
+
+
+def save_cache():
+    ''' save the member cache in DISK_CACHE_DIR, called when a form is closed
+    '''
+    if disk_cache:
+        try:
+            disk_cache.save(member_cache.values())
+        except Exception as error:
+            print('Member cache not saved : ' + str(error))
+
+
+def type_name(pytype):
+    ''' short unique name of a type, used to check cached entries
+    '''
+    return '{0}.{1}'.format(getattr(pytype, '__module__', ''), pytype.__name__)
+
+
+def sys_members():
+    ''' return the set of System.Object members, computed once
+    '''
+    global _sys_members
+    if _sys_members is None:
+        _sys_members = frozenset(dir(System.Object))
+    return _sys_members
+
+
+class Pending(object):
+    ''' Placeholder of a value not read yet
+    '''
+    def __str__(self):
+        return '...'
+        
+    def ToString(self):
+        return '...'
+
+
+PENDING = Pending()
+_sys_members = None
+_declared_members = {}
+disk_cache = DiskCache(DISK_CACHE_DIR) if DISK_CACHE_DIR else None
+member_cache = LRUCache(MEMBER_CACHE_SIZE, on_evict=disk_cache and disk_cache.keep)
+
+
+class Prefetcher(object):
+    ''' Warm the member cache with the types of the hovered properties on a worker
+        thread : dir(), doc of the type and its methods are read from the type alone,
+        so opening an instance later only calls the getters (UI thread).
+        Each scheduled type is warmed with the types of its properties, down to depth
+        levels within budget ms. The types already in the member cache are skipped,
+        a type evicted from it can be warmed again. Navigation to a warmed type still
+        in the member cache counts as a hit.
+    '''
+    def __init__(self, depth=PREFETCH_DEPTH, budget=PREFETCH_BUDGET_MS):
+        self.depth = depth
+        self.budget = budget
+        self.queue = deque()
+        self.queued = set()
+        self.warmed = set()
+        self.thread = None
+        self.method_type = None
+        self.scheduled = 0
+        self.cached = 0
+        self.hits = 0
+        self.misses = 0
+        self.ms = 0.0
+        self._lock = threading.Lock()
+        
+    def schedule(self, pytype):
+        ''' queue a type seen once, the worker is started if idle
+            arg : the declared type of a property
+        '''
+        if self.depth <= 0 or pytype in member_cache or not prefetchable(pytype):
+            return
+        with self._lock:
+            if pytype in self.queued:
+                return
+            self.queued.add(pytype)
+            self.queue.append(pytype)
+            self.scheduled += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+                
+    def run(self):
+        while True:
+            with self._lock:
+                if not self.queue:
+                    self.thread = None
+                    return
+                pytype = self.queue.popleft()
+            start = time.clock()
+            try:
+                self.warm(pytype, start + self.budget / 1000.0)
+            finally:
+                with self._lock:
+                    self.queued.discard(pytype)
+            self.ms += (time.clock() - start) * 1000.0
+            
+    def warm(self, root, deadline):
+        ''' warm root then the types of its properties, breadth first
+            args :
+                root : the type
+                deadline : time.clock() after which nothing more is warmed
+        '''
+        pending = deque([(root, 1)])
+        visited = set([root])
+        while pending and time.clock() < deadline:
+            pytype, level = pending.popleft()
+            if not prefetchable(pytype):
+                continue
+            try:
+                children = self.warm_type(pytype, deadline)
+            except Exception:
+                continue
+            if level < self.depth:
+                for child in children:
+                    if child not in visited and child not in member_cache:
+                        visited.add(child)
+                        pending.append((child, level + 1))
+                        
+    def warm_type(self, pytype, deadline):
+        ''' fill the TypeInfo of the instances of a CLR type, as type_info(instance)
+            would create it, return the declared types of its properties
+            arg : the type
+        '''
+        if self.method_type is None:
+            self.method_type = type_name(type(System.Object().ToString))
+        if not api_docs.ready:
+            api_docs.start().join()   # worker thread : wait for the offline doc
+        if pytype in member_cache:
+            self.cached += 1
+            info = None
+        else:
+            info = TypeInfo(True)
+            if disk_cache:
+                disk_cache.fill(info, pytype, False)
+            if info.names is None:
+                info.names = dir(pytype)
+            if info.doc is None:
+                info.doc = join_doc(api_doc(pytype), pytype.__doc__)
+                
+        children = []
+        for member in (info.names if info else dir(pytype)):
+            if time.clock() > deadline:
+                break
+            desc = class_attribute(pytype, member)
+            kind = type(desc).__name__
+            if kind == 'getset_descriptor':
+                children.append(desc.PropertyType)
+            elif info and kind == 'method_descriptor' and member not in info.members:
+                doc = join_doc(api_doc(pytype, member), desc.__doc__)
+                info.members[member] = ('Func', '', doc, self.method_type, False)
+                
+        if info and pytype not in member_cache:
+            member_cache.put(pytype, info)
+            with self._lock:
+                self.warmed.add(pytype)
+        return children
+        
+    def navigated(self, obj):
+        ''' count a hit when the opened object has a warmed type
+            arg : ref to object
+        '''
+        with self._lock:
+            self.prune()
+            if type(obj) in self.warmed:
+                self.hits += 1
+            else:
+                self.misses += 1
+                
+    def prune(self):
+        ''' forget the warmed types evicted from the member cache (with the lock)
+        '''
+        self.warmed = set(pytype for pytype in self.warmed if pytype in member_cache)
+            
+    def stats(self):
+        ''' return a dict with the scheduled and warmed types, hits and ms, for the REPL
+        '''
+        with self._lock:
+            self.prune()
+        return {'scheduled': self.scheduled, 'warmed': len(self.warmed),
+                'cached': self.cached, 'hits': self.hits, 'misses': self.misses,
+                'ms': round(self.ms, 1), 'depth': self.depth, 'budget': self.budget}
+
+
+def prefetchable(pytype):
+    ''' True for the CLR classes with members worth warming,
+        not the builtins, the enums or the collections
+        arg : the type
+    '''
+    if not isinstance(pytype, type) or issubclass(pytype, (basestring, int, long, float, bool)):
+        return False
+    try:
+        clrtype = clr.GetClrType(pytype)
+        return (clrtype.IsClass and not clrtype.Assembly.IsDynamic
+                and not clr.GetClrType(IEnumerable).IsAssignableFrom(clrtype))
+    except Exception:
+        return False
+
+
+prefetcher = Prefetcher()
 
 
 #               #               #
 #             UTILS
 #               #               #
 
-def extract_main(obj):
+def extract_main(obj, info=None):
     ''' extract the main info for the richtextbox
         args : 
             obj : ref to object
+            info : TypeInfo of the object, None to look it up
     '''   
     try:
         top_name = obj.__name__
@@ -222,11 +1486,13 @@ def extract_main(obj):
     except Exception:
         top_name = str(obj)
     
+    info = info or type_info(obj)
     try:
-        if '__module__' in dir(obj):
+        names = member_names(obj, info)
+        if '__module__' in names:
             top_parent = obj.__module__
         
-        elif 'ToString' in dir(obj):
+        elif 'ToString' in names:
             top_parent = obj.ToString()
         
         else:
@@ -237,7 +1503,10 @@ def extract_main(obj):
     top_link = apidoc_linker(obj)
     
     try:
-        top_doc =  obj.__doc__
+        if info.doc is None:
+            info.doc = join_doc(api_doc(owner_type(obj)), obj.__doc__)
+            info.api_pending = info.api_pending or not api_docs.ready
+        top_doc = info.doc
         
     except Exception:
         top_doc =  'No doc available'
@@ -246,75 +1515,582 @@ def extract_main(obj):
         [el for el in [top_name, top_parent, top_link, top_doc] if el])
 
 
-def extract_members(obj, filtersys=False):
+def extract_members(obj, filtersys=False, lazy=False, timings=None, budget=OBJECT_BUDGET_MS,
+                    refs=None, info=None, pending=False):
     ''' extract the max from each member to populate the datagridview
+        the static part of each member (kind, doc) is read from the type cache
         args : 
             obj : ref to object
             filtersys : bool True to hide members inherited from System.Object
+            lazy : bool True to leave the property values PENDING (see peek_member)
+            timings : dict filled with member -> ms of getattr, None to skip timing
+            budget : ms after which the values are no longer read, None for no limit
+            refs : dict filled with member -> object for the CRAWL_KINDS members
+            info : TypeInfo of the object, None to look it up
+            pending : bool True to leave PENDING the values over the budget (read when shown)
     '''
+    info = info or type_info(obj)
+    dir_obj = member_names(obj, info, filtersys)
+
+    if lazy:
+        return [peek_member(obj, member, info) for member in dir_obj]
+    
     grid_infos = []
+    deadline = None if budget is None else time.clock() + budget / 1000.0
+    for member in dir_obj:
+        if deadline is None or time.clock() < deadline:
+            grid_infos.append(read_member(obj, member, info, timings, refs=refs))
+        else:
+            member, mtype, val, doc = peek_member(obj, member, info)
+            if val is PENDING and not pending:
+                val = ''
+                doc = 'Not read, over the time budget of the object\n' + (doc or '')
+            grid_infos.append((member, mtype, val, doc))
+    return grid_infos
+
+
+def peek_member(obj, member, info):
+    ''' same as read_member without reading the member on obj (safe on a worker thread),
+        the kind and doc come from the type cache or the descriptor of the class,
+        the value is PENDING until read_member is called on the UI thread
+        args :
+            obj : ref to object
+            member : name of the member
+            info : TypeInfo of the object
+    '''
+    entry = info.members.get(member)
+    if entry:
+        if info.static and entry[0] in STATIC_KINDS:
+            return (member, entry[0], entry[1], entry[2])
+        return (member, entry[0], PENDING, entry[2])
     
-    dir_obj = dir(obj)
+    if not isinstance(obj, (type, ModuleType)) and member not in getattr(obj, '__dict__', ()):
+        desc = class_attribute(type(obj), member)
+        kind = type(desc).__name__
+        if kind in LAZY_DESCRIPTORS:
+            try:
+                doc = desc.PropertyType.__doc__
+            except Exception:
+                doc = desc.__doc__
+            doc = join_doc(api_doc(type(obj), member), doc)
+            return (member, 'Prop', PENDING, doc)
+        if kind in METHOD_DESCRIPTORS:
+            return (member, 'Func', '', join_doc(api_doc(type(obj), member), desc.__doc__))
+    
+    # members of types and modules (static getters...), instance attributes
+    return (member, '', PENDING, '')
+
+
+def sort_key(row):
+    ''' precomputed sort key of a row, one lowered string per column
+        arg : a row (member, type, val, docstring)
+    '''
+    return tuple(unicode(cell).lower() if cell is not None else u'' for cell in row)
+
+
+def type_hierarchy(obj):
+    ''' the classes declaring the members of obj, from its own type to object
+        (Wall, HostObject, Element, object), empty for a module
+    '''
+    if isinstance(obj, ModuleType):
+        return ()
+    return owner_type(obj).__mro__
+
+
+def declared_members(cls):
+    ''' return the set of the members declared by a class, computed once per class
+        arg : the class
+    '''
+    names = _declared_members.get(cls)
+    if names is None:
+        try:
+            names = frozenset(vars(cls))
+        except TypeError:
+            base = cls.__base__
+            names = frozenset(dir(cls)) - frozenset(dir(base) if base else ())
+        _declared_members[cls] = names
+    return names
+
+
+def member_owners(obj, info):
+    ''' return the dict member -> depth in type_hierarchy of the declaring class,
+        0 for the own type, cached in the TypeInfo
+        args :
+            obj : ref to object
+            info : TypeInfo of the object
+    '''
+    if info.owners is not None:
+        return info.owners
+    hierarchy = type_hierarchy(obj)
+    owners = {}
+    for member in member_names(obj, info):
+        owners[member] = 0   # instance attributes
+        for depth, cls in enumerate(hierarchy):
+            if member in declared_members(cls):
+                owners[member] = depth
+                break
+    if info.static:
+        info.owners = owners
+    return owners
+
+
+def member_names(obj, info, filtersys=False):
+    ''' return the sorted member names, dir() is cached for static types
+        args :
+            obj : ref to object
+            info : TypeInfo of the object
+            filtersys : bool True to hide members inherited from System.Object
+    '''
+    if info.names is not None:
+        dir_obj = info.names
+    else:
+        dir_obj = dir(obj)
+        if info.static:
+            info.names = dir_obj
     
     if filtersys:
-        dir_obj = sorted(set(dir_obj) - set(dir(System.Object)))
+        dir_obj = sorted(set(dir_obj) - sys_members())
+    return dir_obj
 
-    for member in dir_obj:
+
+def read_member(obj, member, info, timings=None, force=False, refs=None):
+    ''' return the row (member, type, val, docstring) of one member,
+        the classification is skipped when the type cache already knows it
+        args :
+            obj : ref to object
+            member : name of the member
+            info : TypeInfo of the object
+            timings : dict to record the ms spent in getattr, None to skip timing
+            force : bool True to read a member marked slow
+            refs : dict to keep the objects of the CRAWL_KINDS members, or None
+    '''
+    entry = info.members.get(member)
+    try:
+        if entry and info.static and entry[0] in STATIC_KINDS:
+            return (member, entry[0], entry[1], entry[2])
+        
+        if member in info.slow and not force:
+            if timings is not None:
+                timings[member] = info.slow[member]
+            return (member, 'slow', '', 
+                'Not read, the getter took {0:.0f} ms'.format(info.slow[member]))
+        
+        start = time.clock()
         try:
             ref_memb = getattr(obj, member)
-            val = ''
-            doc = ref_memb.__doc__
-            
-            if type(ref_memb).__name__ == 'builtin_function_or_method':
-                mtype = 'Func'
-                
-            elif type(ref_memb).__name__ == 'BoundEvent':
-                mtype = 'Event'
-                handler = ref_memb.Event.Info.EventHandlerType.ToString()
-                val = handler.split('.').pop()[:-1]
-                doc = ref_memb.Event.__doc__
-            
-            elif type(ref_memb).__name__ == 'indexer#':
-                mtype = 'Prop'
-                doc = ref_memb.PropertyType.__doc__
-                
-            elif type(ref_memb).__name__ == 'getset_descriptor':
-                mtype = 'Prop'
-                doc = ref_memb.PropertyType.__doc__
-                
-            elif isinstance(ref_memb, type): 
-                mtype = 'Class'
-                val = type(ref_memb).__name__
-                
-            elif (isinstance(ref_memb, str)
-               or isinstance(ref_memb, bool)
-               or isinstance(ref_memb, int)
-               or isinstance(ref_memb, float)):
-                mtype = 'Prop'
-                val = ref_memb
-                doc = 'Builtin : '+ type(ref_memb).__name__
-                
-            elif clr.GetClrType(type(ref_memb)).IsEnum:
-                mtype = 'Enum'
-                val = ref_memb
-                
-            elif clr.GetClrType(type(ref_memb)).IsClass:
-                mtype = 'Class'
-                val = type(ref_memb).__name__
-                
+        finally:
+            elapsed = (time.clock() - start) * 1000.0
+            if timings is not None:
+                timings[member] = elapsed
+            if elapsed > MEMBER_BUDGET_MS:
+                info.slow[member] = elapsed
             else:
-                mtype = 'TODO'
-                val = ref_memb
+                info.slow.pop(member, None)
+        
+        if entry and entry[3] == type_name(type(ref_memb)):
+            mtype, val, doc, _, dynamic = entry
+        else:
+            mtype, val, doc, dynamic = classify_member(ref_memb)
+            doc = join_doc(api_doc(owner_type(obj), member), doc)
+            info.members[member] = (mtype, val, doc, type_name(type(ref_memb)), dynamic)
+            info.api_pending = info.api_pending or not api_docs.ready
+        
+        if refs is not None and mtype in CRAWL_KINDS and not isinstance(ref_memb, type):
+            refs[member] = ref_memb
+        
+        if dynamic:
+            val = member_value(mtype, ref_memb)
             
-            if doc:
-                doc = doc.strip()
+        return (member, mtype, val, doc)
+        
+    except Exception as error:
+        return (member, 'n/a', '', str(error))
 
-            grid_infos.append((member, mtype, val, doc))
-            
+
+def classify_member(ref_memb):
+    ''' find the kind of a member and its doc
+        return a tuple (type, val, docstring, dynamic)
+        dynamic is True when val is the instance value itself
+        arg : ref of member
+    '''
+    val = ''
+    dynamic = False
+    doc = ref_memb.__doc__
+    
+    if type(ref_memb).__name__ == 'builtin_function_or_method':
+        mtype = 'Func'
+        
+    elif type(ref_memb).__name__ == 'BoundEvent':
+        mtype = 'Event'
+        handler = ref_memb.Event.Info.EventHandlerType.ToString()
+        val = handler.split('.').pop()[:-1]
+        doc = ref_memb.Event.__doc__
+    
+    elif type(ref_memb).__name__ == 'indexer#':
+        mtype = 'Prop'
+        doc = ref_memb.PropertyType.__doc__
+        
+    elif type(ref_memb).__name__ == 'getset_descriptor':
+        mtype = 'Prop'
+        doc = ref_memb.PropertyType.__doc__
+        
+    elif isinstance(ref_memb, type): 
+        mtype = 'Class'
+        val = type(ref_memb).__name__
+        
+    elif (isinstance(ref_memb, str)
+       or isinstance(ref_memb, bool)
+       or isinstance(ref_memb, int)
+       or isinstance(ref_memb, float)):
+        mtype = 'Prop'
+        dynamic = True
+        doc = 'Builtin : '+ type(ref_memb).__name__
+        
+    elif isinstance(ref_memb, (dict, IDictionary)):
+        mtype = 'Map'
+        dynamic = True
+        
+    elif isinstance(ref_memb, (list, tuple, set, frozenset, IEnumerable)):
+        mtype = 'List'
+        dynamic = True
+        
+    elif clr.GetClrType(type(ref_memb)).IsEnum:
+        mtype = 'Enum'
+        dynamic = True
+        
+    elif clr.GetClrType(type(ref_memb)).IsClass:
+        mtype = 'Class'
+        val = type(ref_memb).__name__
+        
+    else:
+        mtype = 'TODO'
+        dynamic = True
+    
+    if doc:
+        doc = doc.strip()
+
+    return mtype, val, doc, dynamic
+
+
+def member_value(mtype, ref_memb):
+    ''' value displayed for a dynamic member, collections are summarised
+        args :
+            mtype : kind of the member
+            ref_memb : ref of member
+    '''
+    if mtype in COLLECTION_KINDS:
+        return summarize_collection(ref_memb)
+    return ref_memb
+
+
+def collection_count(coll):
+    ''' count the items without enumerating the collection, None if unknown
+        arg : ref of collection
+    '''
+    try:
+        return len(coll)
+    except Exception:
+        pass
+    for getter in ('Size', 'GetElementCount'):  # Revit sets, FilteredElementCollector
+        try:
+            count = getattr(coll, getter)
+            return count() if callable(count) else count
+        except Exception:
+            pass
+    return None
+
+
+def summarize_collection(coll):
+    ''' return the count and the first items of a collection as a string,
+        only COLLECTION_PREVIEW items are enumerated
+        arg : ref of collection
+    '''
+    count = collection_count(coll)
+    try:
+        if isinstance(coll, (dict, IDictionary)):
+            preview = [u'{0}: {1}'.format(item_label(key), item_label(coll[key]))
+                       for key in islice(iter(coll), COLLECTION_PREVIEW)]
+        else:
+            preview = [item_label(item) for item in islice(iter(coll), COLLECTION_PREVIEW)]
+    except Exception as error:
+        preview = [str(error)]
+    
+    if count is None or count > len(preview):
+        preview.append('...')
+    return u'Count: {0}  [{1}]'.format('?' if count is None else count, ', '.join(preview))
+
+
+def item_label(item):
+    ''' short label of an item in a collection : value, name or type
+        arg : ref of item
+    '''
+    if isinstance(item, (str, bool, int, float)) or item is None:
+        return unicode(item)
+    for path in (('Name',), ('Definition', 'Name')):  # elements, parameters
+        try:
+            name = reduce(getattr, path, item)
+            return u'{0} ({1})'.format(name, type(item).__name__)
+        except Exception:
+            pass
+    return type(item).__name__
+
+
+def extract_items(page, count=ITEMS_PAGE_SIZE):
+    ''' read the next items of a collection page, the enumeration stops after count
+        items and resumes from page.cursor on the next call
+        return the rows (label, type, val, docstring) of the new items
+        args :
+            page : Page of a collection
+            count : number of items to read
+    '''
+    coll = page.resolve()
+    if page.cursor is None:
+        page.cursor = iter(coll)
+        page.items = OrderedDict()
+    is_map = isinstance(coll, (dict, IDictionary))
+    
+    rows = []
+    start = len(page.items)
+    for index, item in enumerate(islice(page.cursor, count), start):
+        if is_map:
+            label = u'[{0}]'.format(item_label(item))
+            item = coll[item]
+        else:
+            label = u'[{0}]'.format(index)
+        page.items[label] = item
+        try:
+            mtype, val, doc, dynamic = classify_member(item)
+            if dynamic:
+                val = member_value(mtype, item)
+            rows.append((label, mtype, val, doc))
+        except Exception as error:
+            rows.append((label, 'n/a', '', str(error)))
+    return rows
+
+
+def profile(obj, path=None, filtersys=True):
+    ''' time the getattr of each member of an object, from the REPL :
+        >>>rph.profile(wall, 'C:\\temp\\wall.csv')
+        return a list of (ms, member) sorted from the slowest
+        args :
+            obj : ref to object
+            path : csv file to write, None to skip
+            filtersys : bool True to hide members inherited from System.Object
+    '''
+    timings = {}
+    rows = extract_members(obj, filtersys, timings=timings, budget=None)
+    if path:
+        write_timings(path, rows, timings)
+    return sorted(((ms, member) for member, ms in timings.items()), reverse=True)
+
+
+def write_timings(path, rows, timings):
+    ''' write the timings of the rows to a csv file, the slowest first
+        args :
+            path : csv file
+            rows : list of rows (member, type, val, docstring)
+            timings : dict member -> ms
+    '''
+    timed = [(timings[row[0]], row[0], row[1]) for row in rows if row[0] in timings]
+    with open(path, 'wb') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['Name', 'Type', 'ms'])
+        for ms, member, mtype in sorted(timed, reverse=True):
+            writer.writerow([member, mtype, '{0:.3f}'.format(ms)])
+
+
+def owner_type(obj):
+    ''' the type holding the members of obj : obj itself for a type
+    '''
+    return obj if isinstance(obj, type) else type(obj)
+
+
+def class_attribute(pytype, member):
+    ''' the descriptor of a member found in the class dicts along the mro,
+        a static property is not read (getattr(XYZ, 'Zero') calls its getter)
+        args :
+            pytype : the type
+            member : name of the member
+    '''
+    for cls in getattr(pytype, '__mro__', (pytype,)):
+        try:
+            attrs = vars(cls)
+        except TypeError:
+            continue
+        if member in attrs:
+            return attrs[member]
+    return None
+
+
+def join_doc(*docs):
+    ''' join the non empty docstrings, stripped
+    '''
+    return '\n'.join(doc.strip() for doc in docs if doc and doc.strip())
+
+
+#               #               #
+#           OFFLINE DOC
+#               #               #
+
+class ApiDocIndex(object):
+    ''' Summaries of the Revit API read from the xml doc files of the assemblies,
+        keyed by full member name without the parameters (Autodesk.Revit.DB.Wall.Flip).
+        The xml files are parsed once per version, the index is then saved as json
+        next to the member cache. It is built or loaded on a worker thread, the
+        lookups return None until it is ready (see forget_api_pending).
+    '''
+    def __init__(self, folder):
+        self.folder = folder
+        self.docs = {}
+        self.ready = False
+        self.thread = None
+        self._lock = threading.Lock()
+        
+    def start(self):
+        ''' start the build once, return the thread
+        '''
+        with self._lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.build)
+                self.thread.daemon = True
+                self.thread.start()
+        return self.thread
+        
+    def build(self):
+        try:
+            self.docs = self.load()
         except Exception as error:
-            grid_infos.append((member, 'n/a', '', str(error)))
+            print('Offline doc not loaded : ' + str(error))
+        self.ready = True
+        forget_api_pending()
+        
+    def get(self, key):
+        if not self.ready:
+            self.start()
+            return None
+        return self.docs.get(key)
+        
+    def load(self):
+        ''' read the saved index of each assembly, parse its xml file if needed
+        '''
+        docs = {}
+        for assembly in AppDomain.CurrentDomain.GetAssemblies():
+            name = assembly.GetName()
+            if name.Name not in API_DOC_ASSEMBLIES:
+                continue
+            saved = None
+            if self.folder:
+                saved = os.path.join(self.folder, 'apidoc_{0}_{1}.json'.format(name.Name, name.Version))
+                if os.path.isfile(saved):
+                    with open(saved) as docfile:
+                        docs.update(json.load(docfile))
+                    continue
+                    
+            folder = API_DOC_DIR or os.path.dirname(assembly.Location)
+            xmlpath = os.path.join(folder, name.Name + '.xml')
+            if not os.path.isfile(xmlpath):
+                continue
+            parsed = parse_xml_doc(xmlpath)
+            docs.update(parsed)
+            if saved:
+                if not os.path.isdir(self.folder):
+                    os.makedirs(self.folder)
+                with open(saved, 'w') as docfile:
+                    json.dump(parsed, docfile, separators=(',', ':'))
+        return docs
+
+
+def parse_xml_doc(path):
+    ''' read a .Net xml doc file with a forward-only reader
+        return a dict member name -> summary, parameters and returns
+        arg : path of the xml file
+    '''
+    docs = {}
+    reader = XmlReader.Create(path)
+    try:
+        while reader.ReadToFollowing('member'):
+            fullname = reader.GetAttribute('name')
+            if not fullname or ':' not in fullname:
+                continue
+            key = fullname.split(':', 1)[1].split('(')[0]
+            text = read_member_doc(reader.ReadSubtree())
+            if not text:
+                continue
+            if key in docs and text not in docs[key]:
+                docs[key] += '\n' + text   # overloads
+            else:
+                docs[key] = text
+    finally:
+        reader.Close()
+    return docs
+
+
+def read_member_doc(sub):
+    ''' text of one <member> node : summary, one line per param, returns
+        arg : XmlReader of the member subtree
+    '''
+    sections = []
+    while sub.Read():
+        if sub.NodeType == XmlNodeType.Element:
+            if sub.Name == 'summary':
+                sections.append(['', []])
+            elif sub.Name == 'param':
+                sections.append([sub.GetAttribute('name') + ' : ', []])
+            elif sub.Name == 'returns':
+                sections.append(['Returns : ', []])
+            elif sub.Name in ('remarks', 'exception', 'example', 'since'):
+                sections.append([None, []])
+            elif sections:
+                ref = (sub.GetAttribute('cref') or sub.GetAttribute('name')
+                       or sub.GetAttribute('langword'))
+                if ref:   # <see cref="T:Autodesk.Revit.DB.Wall"/> -> Wall
+                    sections[-1][1].append(ref.split(':')[-1].split('(')[0].split('.')[-1])
+        elif sub.NodeType in (XmlNodeType.Text, XmlNodeType.CDATA) and sections:
+            sections[-1][1].append(sub.Value)
+    sub.Close()
     
-    return grid_infos
+    lines = []
+    for title, texts in sections:
+        text = re.sub(r'\s+', ' ', ' '.join(texts)).strip()
+        if title is not None and text:
+            lines.append(title + text)
+    return '\n'.join(lines)
+
+
+def api_doc(pytype, member=None):
+    ''' offline doc of a Revit API type, or of one of its members
+        (searched along the base types), '' if unknown
+        args :
+            pytype : the type
+            member : name of the member, None for the type itself
+    '''
+    try:
+        clrtype = clr.GetClrType(pytype)
+        if not (clrtype.FullName or '').startswith('Autodesk.Revit'):
+            return ''
+        while clrtype is not None and clrtype.FullName:
+            key = clrtype.FullName.replace('+', '.')
+            text = api_docs.get(key + '.' + member if member else key)
+            if text or not member:
+                return text or ''
+            clrtype = clrtype.BaseType
+    except Exception:
+        pass
+    return ''
+
+
+api_docs = ApiDocIndex(DISK_CACHE_DIR)
+
+
+def forget_api_pending():
+    ''' drop the docs cached before the offline doc was ready, they are read
+        again with the offline doc on the next extraction
+    '''
+    for info in member_cache.values():
+        if info.api_pending:
+            info.members = {}
+            info.doc = None
+            info.api_pending = False
 
 
 def apidoc_linker(obj):
@@ -335,6 +2111,470 @@ def apidoc_linker(obj):
     return txt
 
 
+#               #               #
+#            SNAPSHOT
+#               #               #
+
+class SnapshotNode(object):
+    ''' One object read back from a snapshot file, displayed by the explorer
+        without Revit : h(rph.load_snapshot(path))
+        refs : dict member -> SnapshotNode, for the members crawled too
+    '''
+    def __init__(self, record, docs):
+        self.id = record['id']
+        self.path = record['path']
+        self.typename = record['type']
+        self.info = record['info']
+        self.rows = [tuple(row) + (docs.get(row[0], ''),) for row in record['rows']]
+        self.ref_ids = record['refs']
+        self.refs = {}
+
+
+def object_key(obj):
+    ''' identity of an object for the crawler : the UniqueId of a Revit element
+        (the python wrappers of an element differ), id() otherwise
+    '''
+    if not isinstance(obj, type):
+        try:
+            uid = obj.UniqueId
+            if isinstance(uid, basestring):
+                return uid
+        except Exception:
+            pass
+    return id(obj)
+
+
+def crawl(obj, path, depth=2, max_nodes=500, budget_ms=CRAWL_BUDGET_MS, filtersys=True):
+    ''' walk the objects reachable from obj breadth-first (members and collection items),
+        each object is written once to a json lines file, the cycles are cut by identity
+        >>>rph.crawl(wall, 'C:\\temp\\wall.jsonl', depth=2)
+        return the number of objects written
+        args :
+            obj : ref to object
+            path : json lines file to write
+            depth : max distance from obj
+            max_nodes : max number of objects
+            budget_ms : max duration in ms, the objects left are not written
+            filtersys : bool True to skip members inherited from System.Object
+    '''
+    deadline = time.clock() + budget_ms / 1000.0
+    root_name = type(obj).__name__
+    visited = {object_key(obj): 0}
+    alive = [obj]   # keep the objects alive, their id() must stay unique
+    queue = deque([(obj, 0, 0, root_name)])
+    typedocs = set()
+    written = 0
+    
+    with open(path, 'w') as snapfile:
+        while queue and time.clock() < deadline:
+            node, node_id, level, node_path = queue.popleft()
+            
+            refs = {}
+            rows = extract_members(node, filtersys, refs=refs)
+            kinds = dict((row[0], row[1]) for row in rows)
+            children = []
+            for member, ref in refs.items():
+                if kinds[member] not in COLLECTION_KINDS:
+                    children.append((member, ref))
+                    continue
+                try:
+                    for index, item in enumerate(islice(iter(ref), CRAWL_ITEMS)):
+                        if kinds[member] == 'Map':
+                            index, item = item_label(item), ref[item]
+                        children.append((u'{0}[{1}]'.format(member, index), item))
+                except Exception:
+                    pass  # collection not readable, the summary is in the row
+            
+            ref_ids = {}
+            for label, child in children:
+                key = object_key(child)
+                if key in visited:
+                    ref_ids[label] = visited[key]
+                elif level < depth and len(visited) < max_nodes:
+                    visited[key] = len(visited)
+                    alive.append(child)
+                    ref_ids[label] = visited[key]
+                    queue.append((child, visited[key], level + 1, node_path + '.' + label))
+            
+            nodetype = type_name(type(node))
+            if nodetype not in typedocs:
+                typedocs.add(nodetype)
+                snapfile.write(json.dumps({'kind': 'type', 'type': nodetype,
+                    'docs': dict((row[0], row[3]) for row in rows if row[3])}) + '\n')
+            snapfile.write(json.dumps({'kind': 'node', 'id': node_id, 'depth': level,
+                'path': node_path, 'type': nodetype, 'info': extract_main(node),
+                'rows': [(row[0], row[1], unicode(row[2])) for row in rows],
+                'refs': ref_ids}) + '\n')
+            written += 1
+            
+    return written
+
+
+def load_snapshot(path):
+    ''' read a snapshot file written by crawl, no Revit needed
+        return the root SnapshotNode, its refs lead to the other nodes
+        arg : json lines file
+    '''
+    docs = {}
+    nodes = {}
+    with open(path) as snapfile:
+        for line in snapfile:
+            record = json.loads(line)
+            if record['kind'] == 'type':
+                docs[record['type']] = record['docs']
+            else:
+                nodes[record['id']] = SnapshotNode(record, docs.get(record['type'], {}))
+    for node in nodes.values():
+        node.refs = dict((label, nodes[ref]) for label, ref in node.ref_ids.items() if ref in nodes)
+    return nodes[0]
+
+
+def snapshot_rows(page):
+    ''' source of a snapshot page : the saved rows, the crawled members go in page.items
+        arg : Page of a SnapshotNode
+    '''
+    node = page.resolve()
+    page.items.update(node.refs)
+    rows = list(node.rows)
+    names = set(row[0] for row in rows)
+    rows.extend((label, 'Item', child.typename, '')
+                for label, child in sorted(node.refs.items()) if label not in names)
+    return rows
+
+
+#               #               #
+#              DIFF
+#               #               #
+
+class MemberDiff(object):
+    ''' Comparison of the members (and parameters) of two objects,
+        values are compared as text, changed is the set of the members that differ
+    '''
+    def __init__(self, obj_a, obj_b, only_diff=True):
+        self.title = u'Diff : {0} / {1}'.format(type(obj_a).__name__, type(obj_b).__name__)
+        self.only_diff = only_diff
+        self.snap_a = member_snapshot(obj_a)
+        self.snap_b = member_snapshot(obj_b)
+        # a missing member has no text, it differs from any value
+        self.changed = set(member for member in set(self.snap_a) | set(self.snap_b)
+                           if self.snap_a.get(member, (None, None))[1]
+                           != self.snap_b.get(member, (None, None))[1])
+        
+    def summary(self):
+        return u'{0}\n{1} members differ on {2}'.format(
+            self.title, len(self.changed), len(set(self.snap_a) | set(self.snap_b)))
+
+
+def member_snapshot(obj):
+    ''' return the dict member -> (type, value as text),
+        the objects (Class members) are written with object_text,
+        the parameters of an element are added as @Name
+        arg : ref to object
+    '''
+    snap = {}
+    refs = {}
+    for member, mtype, val, doc in extract_members(obj, True, budget=None, refs=refs):
+        if mtype == 'Class' and member in refs:
+            text = object_text(refs[member])
+        else:
+            text = unicode(val)
+        snap[member] = (mtype, text)
+    for name, text in parameter_values(obj):
+        snap['@' + name] = ('Param', text)
+    return snap
+
+
+def object_text(obj):
+    ''' text telling two objects apart, the type name alone is the same for all :
+        IntegerValue of an id, UniqueId of an element, point or end points of a
+        location, ToString() when the class overrides it
+        arg : ref to object
+    '''
+    name = type(obj).__name__
+    for getter in ('IntegerValue', 'UniqueId'):
+        try:
+            return u'{0} {1}'.format(name, getattr(obj, getter))
+        except Exception:
+            pass
+    try:
+        return u'{0} {1}'.format(name, obj.Point)            # LocationPoint
+    except Exception:
+        pass
+    try:
+        curve = obj.Curve                                     # LocationCurve
+        return u'{0} {1} {2}'.format(name, curve.GetEndPoint(0), curve.GetEndPoint(1))
+    except Exception:
+        pass
+    try:
+        text = obj.ToString()
+        if text != clr.GetClrType(type(obj)).FullName:      # not the default ToString
+            return u'{0} {1}'.format(name, text)
+    except Exception:
+        pass
+    return unicode(name)
+
+
+def parameter_values(obj):
+    ''' return a list of (name, value as text) of the parameters of an element,
+        empty for other objects
+        arg : ref to object
+    '''
+    values = []
+    try:
+        params = obj.Parameters
+        iter(params)
+    except Exception:
+        return values
+    for param in params:
+        try:
+            text = param.AsValueString()
+            if text is None:
+                text = param.AsString()
+            if text is None and param.StorageType.ToString() == 'ElementId':
+                text = param.AsElementId().IntegerValue
+            values.append((param.Definition.Name, unicode(text)))
+        except Exception:
+            pass
+    return values
+
+
+def diff(obj_a, obj_b, only_diff=True, show=True):
+    ''' compare the members and parameters of two objects, from the REPL :
+        >>>rph.diff(wall_a, wall_b)
+        return the MemberDiff, its changed set lists the members that differ
+        args :
+            obj_a, obj_b : refs to objects, the type metadata is read from the cache
+            only_diff : bool True to show only the members that differ
+            show : bool True to open the explorer on the result
+    '''
+    result = MemberDiff(obj_a, obj_b, only_diff)
+    if show:
+        RevitPythonHelper(result)
+    return result
+
+
+def diff_rows(page):
+    ''' source of a diff page : (member, type, value a, value b)
+        arg : Page of a MemberDiff
+    '''
+    result = page.resolve()
+    missing = (None, '<missing>')
+    rows = []
+    for member in sorted(set(result.snap_a) | set(result.snap_b)):
+        if result.only_diff and member not in result.changed:
+            continue
+        mtype, val_a = result.snap_a.get(member, missing)
+        mtype_b, val_b = result.snap_b.get(member, missing)
+        rows.append((member, mtype or mtype_b, val_a, val_b))
+    return rows
+
+
+#               #               #
+#          GLOBAL SEARCH
+#               #               #
+
+class NameIndex(object):
+    ''' Inverted index of the type and member names of the loaded assemblies.
+        Each name is split on its camel case words, every word suffix (lowered)
+        points to the entries (assembly, type, member) : GetCompoundStructure is found
+        with "CompoundStructure", "compound struct" or "structure".
+        Built on a worker thread one assembly at a time (FIND_FIRST first), the names of
+        an assembly are read with reflection once per version and saved as json.
+    '''
+    def __init__(self, folder):
+        self.folder = folder
+        self.assemblies = []
+        self.entries = []
+        self.postings = {}
+        self.words = []
+        self.thread = None
+        self._lock = threading.Lock()
+        
+    def start(self):
+        ''' start the build once, return the thread
+        '''
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.build)
+            self.thread.daemon = True
+            self.thread.start()
+        return self.thread
+        
+    def build(self):
+        assemblies = [asm for asm in AppDomain.CurrentDomain.GetAssemblies() if not asm.IsDynamic]
+        assemblies.sort(key=lambda asm: not asm.GetName().Name.startswith(FIND_FIRST))
+        for assembly in assemblies:
+            try:
+                self.add(assembly.FullName, self.read(assembly))
+            except Exception:
+                pass  # assembly without public types or not readable
+                
+    def read(self, assembly):
+        ''' return the dict type name -> member names of an assembly, saved once
+            arg : Assembly
+        '''
+        name = assembly.GetName()
+        saved = None
+        if self.folder:
+            saved = os.path.join(self.folder, 'names_{0}_{1}.json'.format(name.Name, name.Version))
+            if os.path.isfile(saved):
+                with open(saved) as namesfile:
+                    data = json.load(namesfile)
+                if data['assembly'] == assembly.FullName:
+                    return data['types']
+                    
+        types = reflect_names(assembly)
+        if saved:
+            if not os.path.isdir(self.folder):
+                os.makedirs(self.folder)
+            with open(saved, 'w') as namesfile:
+                json.dump({'assembly': assembly.FullName, 'types': types},
+                          namesfile, separators=(',', ':'))
+        return types
+        
+    def add(self, assembly, types):
+        ''' index the names of one assembly
+            args :
+                assembly : full name of the assembly
+                types : dict type name -> member names
+        '''
+        # the words of the assembly are indexed and sorted without the lock,
+        # then merged in the sorted vocabulary : find() waits only for the merge
+        entries = []
+        postings = {}
+        for typename, members in types.items():
+            for member in [None] + members:
+                name = member or typename.split('.')[-1].split('+')[-1]
+                for word in name_suffixes(name):
+                    postings.setdefault(word, []).append(len(entries))
+                entries.append((typename, member))
+        
+        with self._lock:
+            pos = len(self.assemblies)
+            self.assemblies.append(assembly)
+            first = len(self.entries)
+            self.entries.extend((pos, typename, member) for typename, member in entries)
+            new_words = sorted(word for word in postings if word not in self.postings)
+            for word, ids in postings.items():
+                self.postings.setdefault(word, []).extend(first + entry for entry in ids)
+            self.words = list(merge(self.words, new_words))
+            
+    def find(self, text, limit=FIND_LIMIT):
+        ''' return the entries (assembly, type name, member) matching all the words
+            of the text (prefix of a word suffix), member is None for a type
+            args :
+                text : words to search
+                limit : max number of entries
+        '''
+        terms = [term.lower() for term in re.split(r'\W+', text) if term]
+        hits = None
+        with self._lock:
+            words = self.words
+            for term in terms:
+                ids = set()
+                pos = bisect_left(words, term)
+                while pos < len(words) and words[pos].startswith(term):
+                    ids.update(self.postings[words[pos]])
+                    pos += 1
+                hits = ids if hits is None else hits & ids
+                if not hits:
+                    return []
+            
+            results = []
+            for entry in sorted(hits or ()):
+                pos, typename, member = self.entries[entry]
+                results.append((self.assemblies[pos], typename, member))
+                if len(results) >= limit:
+                    break
+        return results
+        
+    def ready(self):
+        return self.thread is not None and not self.thread.is_alive()
+
+
+def name_suffixes(name):
+    ''' lowered suffixes of a name starting on each camel case word
+        GetCompoundStructure -> getcompoundstructure, compoundstructure, structure
+    '''
+    starts = [match.start() for match in
+              re.finditer(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+', name)]
+    return set(name[start:].lower() for start in starts) or set([name.lower()])
+
+
+def reflect_names(assembly):
+    ''' return the dict type name -> public member names declared by the type
+        arg : Assembly
+    '''
+    flags = (BindingFlags.Public | BindingFlags.Instance
+             | BindingFlags.Static | BindingFlags.DeclaredOnly)
+    types = {}
+    for clrtype in assembly.GetExportedTypes():
+        members = set()
+        try:
+            for info in clrtype.GetMembers(flags):
+                # skip constructors and accessors (get_Name, add_Event...)
+                if info.MemberType == MemberTypes.Constructor or getattr(info, 'IsSpecialName', False):
+                    continue
+                members.add(info.Name)
+        except Exception:
+            pass
+        types[clrtype.FullName] = sorted(members)
+    return types
+
+
+def resolve_type(assembly, typename):
+    ''' return the python type of a type found by the NameIndex
+        args :
+            assembly : full name of a loaded assembly
+            typename : full name of the type
+    '''
+    for loaded in AppDomain.CurrentDomain.GetAssemblies():
+        if loaded.FullName == assembly:
+            return clr.GetPythonType(loaded.GetType(typename))
+    raise LookupError(typename)
+
+
+def find(text, limit=FIND_LIMIT, wait=True):
+    ''' search a type or member name in all the loaded assemblies, from the REPL :
+        >>>rph.find('CompoundStructure')
+        return a list of full names (Namespace.Type.Member)
+        args :
+            text : words to search
+            limit : max number of results
+            wait : bool True to wait for the end of the index build
+    '''
+    thread = name_index.start()
+    if wait and thread.is_alive():
+        print('Indexing the assemblies...')
+        thread.join()
+    return [typename + '.' + member if member else typename
+            for assembly, typename, member in name_index.find(text, limit)]
+
+
+def find_rows(page):
+    ''' source of a Find page : one row per result, the types to open go in page.items
+        arg : Page, the object is the text to search
+    '''
+    rows = []
+    for assembly, typename, member in name_index.find(page.resolve()):
+        # full names : Autodesk.Revit.DB.Line and System.Windows.Shapes.Line differ
+        label = typename.replace('+', '.') + ('.' + member if member else '')
+        if label in page.items:
+            label += ' [{0}]'.format(assembly.split(',')[0])
+        try:
+            pytype = resolve_type(assembly, typename)
+        except Exception:
+            continue
+        page.items[label] = pytype
+        rows.append((label, 'Member' if member else 'Type', assembly.split(',')[0],
+                     api_doc(pytype, member)))
+    if not name_index.ready():
+        rows.append(('', 'n/a', '', 'Indexing the assemblies in progress, try again for more results'))
+    return rows
+
+
+name_index = NameIndex(DISK_CACHE_DIR)
+
+
 #               #               #
 #          EXTERNAL CALL
 #               #               #
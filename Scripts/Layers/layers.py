@@ -4,6 +4,17 @@
  Get the layers details from the types hosting a compound structure
  format values and display to excel via csv
 
+ The export is a chain of generators, usable from other scripts :
+ collect_types -> extract_structures -> format_rows(structures, units) -> write_rows
+
+ Take-off (USER_takeoff) : area and volume of each material of the placed instances,
+ the instances are read in one collector pass, one row per type and layer to pivot
+
+ Batch : export a list of models without UI, one flat table with a document column
+ >>>import layers
+ >>>layers.batch_export(paths, 'C:\\temp\\layers.txt',
+ ...                    layers.RevitDocuments(__revit__.Application), ['Walls', 'Floors'])
+
 '''
 __doc__ = 'Get the layers details from the types hosting a compound structure'
 
@@ -11,8 +22,16 @@ print('Loading API Components...')
 import os
 import csv
 import clr
+import json
+import time
+import hashlib
+import shutil
+from collections import deque
+from itertools import chain
 
-from Autodesk.Revit.DB import Element, FilteredElementCollector, CategoryType
+from Autodesk.Revit.DB import Element, FilteredElementCollector, CategoryType, Document
+from Autodesk.Revit.DB import ElementId, ElementMulticategoryFilter, BuiltInParameter
+from Autodesk.Revit.DB import OpenOptions, DetachFromCentralOption, ModelPathUtils, BasicFileInfo
 from Autodesk.Revit.DB import UnitUtils, DisplayUnitType 
 from Autodesk.Revit.UI import TaskDialog
 
@@ -25,77 +44,198 @@ from System.Drawing import Size, Point
 from System import Object
 from System.Collections.Generic import List
 
-uidoc = __revit__.ActiveUIDocument
-doc = __revit__.ActiveUIDocument.Document
-view = uidoc.ActiveGraphicalView
-
 ###################################################### CONFIG PART #############
 
-# Base Units for conversion
+# Base Units for conversion, output units side by side : (unit, label, decimals)
 USER_UNIT_IN = DisplayUnitType.DUT_DECIMAL_FEET
-USER_UNIT_OUT = DisplayUnitType.DUT_MILLIMETERS
+USER_UNITS_OUT = [(DisplayUnitType.DUT_MILLIMETERS, 'mm', 0),
+                  # (DisplayUnitType.DUT_DECIMAL_INCHES, 'in', 2),
+                 ]
+
+# incremental export : the structures are kept in a json file next to the output
+# (bump the format when the structures change), None to disable it
+USER_cache_suffix = '.cache.json'
+CACHE_FORMAT = 2
+
+# take-off : True to export the area and volume of each material of the placed instances
+# instead of the layers, units of the totals in the same form as USER_UNITS_OUT
+USER_takeoff = False
+USER_AREA_IN = DisplayUnitType.DUT_SQUARE_FEET
+USER_AREA_OUT = [(DisplayUnitType.DUT_SQUARE_METERS, 'm2', 2)]
+USER_VOLUME_IN = DisplayUnitType.DUT_CUBIC_FEET
+USER_VOLUME_OUT = [(DisplayUnitType.DUT_CUBIC_METERS, 'm3', 3)]
 
 # destination and engine (reader after export)
 USER_destination = os.path.expandvars('%temp%\\')
 USER_engine = 'excel' #'scalc'
 
-filename = os.path.basename(doc.PathName)
-filename = os.path.splitext(filename)[0] + '_layers.txt'
-full_filepath = os.path.join(USER_destination, filename)
-
-def format_csv(onetype):
-    ''' format the details
+def output_path(doc, suffix='_layers.txt'):
+    '''file of the export, named after the document
     '''
-    # shortcut on strings to avoid encoding troubles 
-    u = lambda txt: unicode(txt).encode("utf-8")
+    filename = os.path.basename(doc.PathName)
+    filename = os.path.splitext(filename)[0] + suffix
+    return os.path.join(USER_destination, filename)
 
-    structure = None
-    if is_compound(onetype):
+###################################################### PIPELINE PART ###########
+
+def collect_types(context, names=None):
+    '''stage 1 : yield the compound types of the model categories, one collector pass
+       names : category names to keep, None for all
+    '''
+    tfilter = FilteredElementCollector(context.doc).WhereElementIsElementType()
+    
+    for ltype in tfilter:
+        cat = ltype.Category
+        if (cat and cat.CategoryType == CategoryType.Model
+                and (names is None or cat.Name in names) and is_compound(ltype, context)):
+            yield ltype
+            
+            
+def extract_structures(types, context):
+    '''stage 2 : yield the layers_from dict of each compound type
+    '''
+    for onetype in types:
+        if is_compound(onetype, context):
+            yield layers_from(onetype, context)
+        # TODO structure = name + width or height directly from type
         
-        structure = layers_from(onetype)
         
-        pattern = [ [] ,
-            [ u(structure['cat']),       ''       ,        u(structure['name'])        ,    ''   ],
-            [      ''            ,       ''       ,       'Layers from ext. :'         , 'Width'] 
-            ]
+def format_rows(structures, units):
+    '''stage 3 : yield the rows of each structure, one width column per output unit
+       units : UnitConverter of the run
+    '''
+    # shortcut on strings to avoid encoding troubles 
+    u = lambda txt: unicode(txt).encode("utf-8")
+    widths = ['Width ' + label for label in units.labels]
+    blanks = [''] * len(widths)
+    
+    for structure in structures:
+        yield []
+        yield [ u(structure['cat']),       ''       ,        u(structure['name'])        ] + blanks
+        yield [      ''            ,       ''       ,       'Layers from ext. :'         ] + widths
         
         for layer in structure['layers']:
-            pattern.append([ ''  , layer['idlayer'],        u(layer['matos'])      , layer['conv_width'] ])
-        
-        pattern.append([   ''    ,       ''       ,         'Total :'         ,  int(structure['sum']) ])
+            yield [ ''  , layer['idlayer'],        u(layer['matos'])      ] + layer['conv_width']
         
-        return pattern
+        yield [   ''    ,       ''       ,         'Total :'         ] + structure['sum']
         
-    else:
-        pass # return TODO structure = name + width or height directly from type
-         
         
-def layers_from(onetype):
+def write_rows(rows, filepath):
+    '''stage 4 : write the rows to a tab separated file as they come
+       returns the number of rows
+    '''
+    count = 0
+    with open(filepath, 'wb') as csvfile:
+        writer = csv.writer(csvfile, delimiter='\t', quoting=csv.QUOTE_ALL)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+    
+    
+
+def layers_from(onetype, context):
     '''returns a dict with formated parameters for each layer from the given type
+       the structure and the materials are read through the context (once per run)
     '''
-    comp = onetype.GetCompoundStructure()
+    comp = context.structure(onetype)
     structure = { 'name': Element.Name.GetValue(onetype) ,
+                  'id': onetype.Id.IntegerValue ,
                   'cat': onetype.Category.Name ,
+                  'catid': onetype.Category.Id.IntegerValue ,
                   'layers': [],
                   'sum': 0 
                 }
                 
     layers = comp.GetLayers()
+    # all the widths of the type and their sum are converted at once
+    widths = [layer.Width for layer in layers]
+    converted = context.units.convert(widths + [sum(widths)])
     
-    for layer in layers:
-        details = {'conv_width' : int(set_unit(layer.Width)),
+    for index, layer in enumerate(layers):
+        material = context.material(layer.MaterialId)
+        details = {'width' : layer.Width,
+                   'conv_width' : [values[index] for values in converted],
                    'idlayer' : layer.LayerId+1,
-                   'matos' : doc.GetElement(layer.MaterialId).Name,
-                   'matosid' : layer.MaterialId,
-                   'function' : layer.Function
+                   'matos' : material['name'],
+                   'matclass' : material['class'],
+                   'matosid' : layer.MaterialId.IntegerValue,
+                   'function' : str(layer.Function)
                   }
         structure['layers'].append(details)
-        structure['sum'] += layer.Width
         
-    structure['sum'] = set_unit(structure['sum'])
+    structure['sum'] = [values[-1] for values in converted]
 
     return structure
 
+
+class ExportContext(object):
+    '''caches of one export run, the API is called once per type and per material
+       structures : type id -> compound structure (None if not compound)
+       materials : material id -> dict name, class, category
+       units : UnitConverter, the factors are resolved once
+    '''
+    def __init__(self, doc, units=None):
+        self.doc = doc
+        self.structures = {}
+        self.materials = {}
+        self.units = units or UnitConverter()
+        
+    def structure(self, onetype):
+        key = onetype.Id.IntegerValue
+        if key not in self.structures:
+            get_structure = getattr(onetype, 'GetCompoundStructure', None)
+            self.structures[key] = get_structure() if get_structure else None
+        return self.structures[key]
+        
+    def material(self, matid):
+        key = matid.IntegerValue
+        if key not in self.materials:
+            mat = self.doc.GetElement(matid)
+            if mat is None:
+                # layer without material
+                self.materials[key] = {'name': '<By Category>', 'class': '', 'category': ''}
+            else:
+                self.materials[key] = {'name': mat.Name,
+                                       'class': mat.MaterialClass,
+                                       'category': mat.MaterialCategory}
+        return self.materials[key]
+        
+
+class UnitConverter(object):
+    '''convert lists of values from unit_in to each unit of units_out,
+       the factor of each (in, out) pair is read once from UnitUtils
+       units_out : list of (unit, label, decimals)
+    '''
+    def __init__(self, unit_in=USER_UNIT_IN, units_out=USER_UNITS_OUT):
+        self.unit_in = unit_in
+        self.units_out = units_out
+        self.labels = [label for unit, label, digits in units_out]
+        self.factors = [self.factor(unit) for unit, label, digits in units_out]
+        
+    def key(self):
+        '''json description of the conversions, to check saved values
+        '''
+        return [str(self.unit_in)] + [[str(unit), label, digits]
+                                      for unit, label, digits in self.units_out]
+        
+    def factor(self, unit_out):
+        try:
+            return UnitUtils.Convert(1.0, self.unit_in, unit_out)
+        except Exception:
+            return 1.0   # unknown pair : values kept in the base unit
+            
+    def convert(self, values):
+        '''returns one list of converted values per output unit
+        '''
+        results = []
+        for factor, (unit, label, digits) in zip(self.factors, self.units_out):
+            if digits:
+                results.append([round(val * factor, digits) for val in values])
+            else:
+                results.append([int(round(val * factor)) for val in values])
+        return results
+        
 ###################################################### UI PART #################
 
 class Checklist(Form):
@@ -151,93 +291,380 @@ class Checklist(Form):
         
 ###################################################### FUNCT PART ###############
 
-def is_compound(onetype):
+def is_compound(onetype, context):
     ''' return True/False if type contain a valid compound struct
     '''
-    comp = False
-    if 'GetCompoundStructure' in dir(onetype) and onetype.GetCompoundStructure():
-        comp = True
-    return comp
+    return bool(context.structure(onetype))
     
     
-def get_types_by(idcat):
-    '''get types by category and filter if compound struct.
+def get_types_by_category(context):
+    '''get all the types in one collector pass, keep the compound ones
+       returns a dict category name -> list of types, model categories only
+    '''
+    types_by_cat = {}
+    for ltype in collect_types(context):
+        types_by_cat.setdefault(ltype.Category.Name, []).append(ltype)
+            
+    return types_by_cat
+    
+    ''' todo: filter by view /levels
+    '''
+    
+        
+def export_csv_group(group, context, full_filepath):
+    '''write to file and open editor
+       group : list of lists of types (one per category)
+       context : ExportContext of the run
+       full_filepath : the file written
+    '''
+    ready = False
+    try: 
+        types = (onetype for categ in group for onetype in categ)
+        if USER_takeoff:
+            export_takeoff(types, context, full_filepath)
+            
+        elif USER_cache_suffix:
+            cache = LayersCache(full_filepath + USER_cache_suffix, context.units)
+            names = [categ[0].Category.Name for categ in group if categ]
+            write_rows(format_rows(cache.structures(types, context, names), context.units),
+                       full_filepath)
+            cache.save()
+            
+        else:
+            write_rows(format_rows(extract_structures(types, context), context.units),
+                       full_filepath)
+        ready = True
+        
+    except Exception as er:
+        TaskDialog.Show('LayerTool','An Error occured...{}'.format(er.message))
+        
+    if ready:
+        try:
+            os.system('start {0} \"{1}\"'.format(USER_engine, full_filepath))
+        except Exception as er:
+            TaskDialog.Show('LayerTool','Can\'t open an editor...{}'.format(er.message))
+                
+###################################################### TAKE-OFF PART ###########
+
+# columns of the take-off, followed by the area and volume columns
+TAKEOFF_HEADER = ['Category', 'Type', 'Layer', 'Material', 'Function', 'Instances']
+
+
+def instance_totals(doc, type_ids, category_ids):
+    '''one collector pass on the instances of the categories, grouped by type
+       returns a dict type id -> [count, sum of HOST_AREA_COMPUTED]
+       type_ids : set of the type ids to keep
     '''
-    types = None
-    tfilter =  FilteredElementCollector(doc).OfCategoryId(idcat)
-    types = tfilter.WhereElementIsElementType().ToElements()
+    totals = {}
+    tfilter = FilteredElementCollector(doc).WhereElementIsNotElementType()
+    if category_ids:
+        ids = List[ElementId]([ElementId(catid) for catid in category_ids])
+        tfilter = tfilter.WherePasses(ElementMulticategoryFilter(ids))
+        
+    for elem in tfilter:
+        typeid = elem.GetTypeId().IntegerValue
+        if typeid in type_ids:
+            total = totals.setdefault(typeid, [0, 0.0])
+            total[0] += 1
+            param = elem.get_Parameter(BuiltInParameter.HOST_AREA_COMPUTED)
+            if param:
+                total[1] += param.AsDouble()
+    return totals
     
-    return [ltype for ltype in types if is_compound(ltype)]
     
-    ''' todo: select types by cat > checklist 
-        filter by view /levels
+def takeoff_rows(structures, totals, areas, volumes):
+    '''yield one row per layer of the placed types : instances, area of the type
+       and volume of the layer (area x width, joins are not deducted)
+       areas, volumes : UnitConverter of the totals
     '''
+    u = lambda txt: unicode(txt).encode("utf-8")
     
+    for structure in structures:
+        count, area = totals.get(structure['id'], (0, 0.0))
+        if not count:
+            continue
+        area_out = [values[0] for values in areas.convert([area])]
+        volume_out = volumes.convert([area * layer['width'] for layer in structure['layers']])
         
-def set_unit(val):
-    '''display given value with the conversion variables on top
+        for index, layer in enumerate(structure['layers']):
+            yield ([u(structure['cat']), u(structure['name']), layer['idlayer'], u(layer['matos']),
+                    u(layer['function']), count] + area_out + [values[index] for values in volume_out])
+            
+            
+def export_takeoff(types, context, full_filepath):
+    '''write the take-off of the types, the instances are read in one pass
+       returns the number of rows
+    '''
+    structures = list(extract_structures(types, context))
+    type_ids = set(structure['id'] for structure in structures)
+    category_ids = set(structure['catid'] for structure in structures)
+    totals = instance_totals(context.doc, type_ids, category_ids)
+    
+    areas = UnitConverter(USER_AREA_IN, USER_AREA_OUT)
+    volumes = UnitConverter(USER_VOLUME_IN, USER_VOLUME_OUT)
+    header = (TAKEOFF_HEADER + ['Area ' + label for label in areas.labels]
+              + ['Volume ' + label for label in volumes.labels])
+    rows = takeoff_rows(structures, totals, areas, volumes)
+    return write_rows(chain([header], rows), full_filepath)
+    
+###################################################### CACHE PART ##############
+
+class LayersCache(object):
+    '''structures of the previous exports, saved as json next to the output
+       documents : document path -> {'version', 'categories', 'types' : id -> [stamp, structure]}
+       A saved document with the same version is not read again, otherwise a type
+       is extracted only when its stamp (hash of its layers) changed.
+       The file is dropped when the units change (unit, label or decimals).
+    '''
+    def __init__(self, path, units):
+        self.path = path
+        self.units = units.key()
+        self.documents = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(path) as cachefile:
+                data = json.load(cachefile)
+            if data['format'] == CACHE_FORMAT and data['units'] == self.units:
+                self.documents = data['documents']
+        except Exception:
+            pass  # no cache yet, or unreadable : rebuilt on save
+            
+    def structures(self, types, context, categories=None, docpath=None):
+        '''yield the structures of the compound types of the context document,
+           from the cache when unchanged, the entry is replaced once all are read
+           args :
+               types : iterable of types, not iterated if the document is unchanged
+               context : ExportContext
+               categories : category names of the types, None for all
+               docpath : key of the document, default its PathName (empty for
+                         a model opened detached, give the source path)
+        '''
+        docpath = docpath or context.doc.PathName
+        entry = self.documents.get(docpath) or {'version': None, 'categories': None, 'types': {}}
+        version = document_version(context.doc)
+        
+        if version and entry['version'] == version and (entry['categories'] is None
+                or categories and set(categories) <= set(entry['categories'])):
+            cached = [structure for stamp, structure in entry['types'].values()
+                      if categories is None or structure['cat'] in categories]
+            for structure in sorted(cached, key=lambda st: (st['cat'], st['name'])):
+                self.hits += 1
+                yield structure
+            return
+            
+        fresh = {}
+        for onetype in types:
+            if not is_compound(onetype, context):
+                continue
+            key = str(onetype.Id.IntegerValue)
+            stamp = structure_stamp(onetype, context)
+            cached = entry['types'].get(key)
+            if cached and cached[0] == stamp:
+                structure = cached[1]
+                self.hits += 1
+            else:
+                structure = layers_from(onetype, context)
+                self.misses += 1
+            fresh[key] = [stamp, structure]
+            yield structure
+            
+        self.documents[docpath] = {'version': version,
+                                   'categories': sorted(categories) if categories else None,
+                                   'types': fresh}
+        
+    def save(self):
+        with open(self.path, 'w') as cachefile:
+            json.dump({'format': CACHE_FORMAT, 'units': self.units,
+                       'documents': self.documents}, cachefile, separators=(',', ':'))
+            
+            
+def document_version(doc):
+    '''stamp of the saved state of a document, None if unknown or modified since
+       (Document.GetDocumentVersion needs Revit 2021)
     '''
-    val_out = None
     try:
-        val_out = UnitUtils.Convert (val, USER_UNIT_IN, USER_UNIT_OUT)
+        if doc.IsModified:
+            return None
+        version = Document.GetDocumentVersion(doc)
+        return '{0}:{1}'.format(version.VersionGUID, version.NumberOfSaves)
+    except Exception:
+        return None
+        
+        
+def structure_stamp(onetype, context):
+    '''hash of the name and the layers of a type (width, material, function)
+    '''
+    parts = [Element.Name.GetValue(onetype)]
+    for layer in context.structure(onetype).GetLayers():
+        parts.append(u'{0}|{1}|{2}'.format(
+            repr(layer.Width), context.material(layer.MaterialId)['name'], layer.Function))
+    return hashlib.md5(u'\n'.join(parts).encode('utf-8')).hexdigest()
+    
+###################################################### BATCH PART ##############
+
+# columns of the batch output, followed by one width column per output unit
+FLAT_HEADER = ['Document', 'Category', 'Type', 'Layer', 'Material', 'Function']
+
+
+class RevitDocuments(object):
+    '''document provider of batch_export : opens the models detached from central,
+       closes them without saving. Any object with open(path) and close(doc)
+       can replace it (stub documents to try the batch, still inside Revit :
+       this module imports the Revit API)
+    '''
+    def __init__(self, app):
+        self.app = app
+        
+    def open(self, path):
+        options = OpenOptions()
+        if BasicFileInfo.Extract(path).IsWorkshared:
+            options.DetachFromCentralOption = DetachFromCentralOption.DetachAndPreserveWorksets
+        model_path = ModelPathUtils.ConvertUserVisiblePathToModelPath(path)
+        return self.app.OpenDocumentFile(model_path, options)
         
-    except:
-        val_out = val
+    def close(self, doc):
+        doc.Close(False)
         
-    return val_out
+        
+def extract_document(doc, categories=None, units=None, cache=None, path=None):
+    '''yield the structures of the compound types of one document
+       categories : category names to keep, None for all
+       cache : LayersCache to extract only the new or modified types, or None
+       path : path the document was opened from, key of the cache
+    '''
+    context = ExportContext(doc, units)
+    names = set(categories) if categories else None
+    if cache:
+        return cache.structures(collect_types(context, names), context, categories, path)
+    return extract_structures(collect_types(context, names), context)
     
     
-def export_csv_group(group):
-    '''write to file and open editor
+def flat_rows(structures, units, docname):
+    '''yield one row per layer : FLAT_HEADER columns then the widths
     '''
-    ready = False
-    with open(full_filepath, 'wb') as csvfile:
-        try: 
-            writer = csv.writer(csvfile, delimiter='\t', quoting=csv.QUOTE_ALL)
-            ready = False
-            for categ in group:
-                for onetype in get_types_by(categ):
-                    rows = format_csv(onetype)
-                    if rows:
-                        writer.writerows(rows)
-                    
-            ready = True
+    u = lambda txt: unicode(txt).encode("utf-8")
+    
+    for structure in structures:
+        for layer in structure['layers']:
+            yield ([u(docname), u(structure['cat']), u(structure['name']), layer['idlayer'],
+                    u(layer['matos']), u(layer['function'])] + layer['conv_width'])
             
-        except Exception as er:
-            TaskDialog.Show('LayerTool','An Error occured...{}'.format(er.message))
+            
+def batch_export(paths, output, provider, categories=None, state_path=None, extract=None,
+                 cache_path=None, resume=True):
+    '''open each model in turn, export its layers and close it, all the models
+       go to one flat file (FLAT_HEADER columns). The models done are saved in
+       a state file : a new call with the same output resumes after a failure
+       or an interruption. The state file is removed once all the models are done,
+       the next call starts a new output.
+       args :
+           paths : list of .rvt paths
+           output : file written
+           provider : RevitDocuments, or a stub with open(path) and close(doc)
+           categories : category names to export, None for all
+           state_path : json state file, default output + '.state.json'
+           extract : function(doc, categories, units, cache, path) yielding structures,
+                     default extract_document
+           cache_path : LayersCache file, default output + USER_cache_suffix
+           resume : bool False to ignore the state file and start a new output
+       returns a dict of throughput stats
+    '''
+    extract = extract or extract_document
+    state_path = state_path or output + '.state.json'
+    units = UnitConverter()
+    cache = None
+    if cache_path or USER_cache_suffix:
+        cache = LayersCache(cache_path or output + USER_cache_suffix, units)
+    
+    state = {'done': [], 'failed': {}}
+    if resume and os.path.exists(state_path) and os.path.exists(output):
+        with open(state_path) as statefile:
+            state = json.load(statefile)
+    else:
+        write_rows([FLAT_HEADER + ['Width ' + label for label in units.labels]], output)
         
-    if ready:
+    queue = deque(path for path in paths if path not in state['done'])
+    stats = {'documents': 0, 'failed': 0, 'skipped': len(paths) - len(queue),
+             'rows': 0, 'seconds': 0.0}
+    start = time.time()
+    part = output + '.part'
+    
+    while queue:
+        path = queue.popleft()
+        docname = os.path.splitext(os.path.basename(path))[0]
+        doc_start = time.time()
+        doc = None
         try:
-            os.system('start {0} \"{1}\"'.format(USER_engine, full_filepath))
+            doc = provider.open(path)
+            # one document at a time in a part file, appended once complete
+            structures = extract(doc, categories, units, cache, path)
+            count = write_rows(flat_rows(structures, units, docname), part)
+            with open(part, 'rb') as partfile:
+                with open(output, 'ab') as outfile:
+                    shutil.copyfileobj(partfile, outfile)
+            state['done'].append(path)
+            state['failed'].pop(path, None)
+            stats['documents'] += 1
+            stats['rows'] += count
+            print('{0} : {1} rows in {2:.1f} s ({3} left)'.format(
+                docname, count, time.time() - doc_start, len(queue)))
+            
         except Exception as er:
-            TaskDialog.Show('LayerTool','Can\'t open an editor...{}'.format(er.message))
+            state['failed'][path] = str(er)
+            stats['failed'] += 1
+            print('{0} : failed, {1}'.format(docname, er))
+            
+        finally:
+            if doc is not None:
+                try:
+                    provider.close(doc)
+                except Exception:
+                    pass
+            with open(state_path, 'w') as statefile:
+                json.dump(state, statefile, indent=1)
+            if cache:
+                cache.save()
                 
+    if os.path.exists(part):
+        os.remove(part)
+    if not state['failed'] and os.path.exists(state_path):
+        os.remove(state_path)   # complete : nothing to resume
+    if cache:
+        stats['cache_hits'] = cache.hits
+        stats['cache_misses'] = cache.misses
+    stats['seconds'] = round(time.time() - start, 1)
+    minutes = stats['seconds'] / 60.0
+    stats['documents_per_min'] = round(stats['documents'] / minutes, 2) if minutes else None
+    stats['rows_per_s'] = round(stats['rows'] / stats['seconds'], 1) if stats['seconds'] else None
+    return stats
+    
 ###################################################### RUNNING PART ##############
 
-print('Searching and Looping...')
-# Build a dict of categories from the project, exclude non-compound types and non-model category
-categories_comp = {}
+def main():
+    doc = __revit__.ActiveUIDocument.Document
+    
+    print('Searching and Looping...')
+    # Build a dict of categories from the project, exclude non-compound types and non-model category
+    # the types are collected once, the dialog and the export share them
+    context = ExportContext(doc)
+    categories_comp = get_types_by_category(context)
 
-categories = doc.Settings.Categories.ForwardIterator()
-categories.Reset()
+    __window__.Close()
 
-while categories.MoveNext():
-    cat = categories.Current
-    
-    if cat.CategoryType == CategoryType.Model:
-        if get_types_by(cat.Id):
-            categories_comp[cat.Name] = cat
+    # call dialog to check the relevant types
+    dialog_topics = sorted(categories_comp.keys())
+    dialog = Checklist(dialog_topics)
 
-__window__.Close()
+    if dialog.ShowDialog() == DialogResult.OK:    
+        # build list of types from selected items
+        select_cat = [categories_comp[item] for item in dialog.getValid()]
+        
+        if select_cat:
+            suffix = '_takeoff.txt' if USER_takeoff else '_layers.txt'
+            export_csv_group(select_cat, context, output_path(doc, suffix))
 
-# call dialog to check the relevant types
-dialog_topics = sorted(categories_comp.keys())
-dialog = Checklist(dialog_topics)
 
-if dialog.ShowDialog() == DialogResult.OK:    
-    # build list of categoryID from selected items
-    select_cat = [categories_comp[item].Id for item in dialog.getValid()]
-    
-    if select_cat:
-        export_csv_group(select_cat)
+if __name__ == '__main__':
+    main()
         
\ No newline at end of file